@@ -0,0 +1,161 @@
+#! .venv/bin/python3
+
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+# Run many headless simulations in parallel, and summarize their performance
+# Each run is a (scenario, seed, parameters) combination, executed in its own process
+# (so its own logger and scheduler), and writing its own session file. The session numbers
+# are allocated by the workers themselves, through the sessions index.
+# The scenarios of the grid are written into the sessions/batch folder.
+#
+# Usage: batch.py SCENARIO [SCENARIO ...] [--seeds N [N ...]] [--grid GRID.json] [--workers N]
+# - scenarios are given relatively to the includes/scenarios folder (like scenario_path)
+# - the grid file maps 'plugin;parameter' strings to lists of values, for example
+#   {"track;targetproportion": [0.1, 0.2, 0.3], "resman;tank-a-lossperminute": [500, 800]}
+#   Every combination is set at the beginning of each scenario (0:00:00)
+
+import gettext, sys, json
+from argparse import ArgumentParser
+from collections import Counter
+from csv import DictReader
+from math import isfinite
+from multiprocessing import get_context
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+
+# pyglet must not create its hidden shadow window (it needs a display), neither in this process
+# nor in the workers (which import this module first)
+import pyglet
+pyglet.options['shadow_window'] = False
+
+# The core package is only imported by the workers: importing it opens a new session file
+SCENARIOS_PATH = Path('.', 'includes', 'scenarios')
+SESSIONS_PATH = Path('.', 'sessions')
+
+LOCALE_PATH = Path('.', 'locales')
+language_iso = [l for l in open('config.ini', 'r').readlines()
+                if 'language=' in l][0].split('=')[-1].strip()
+language = gettext.translation('openmatb', LOCALE_PATH, [language_iso])
+language.install()
+
+
+def summarize_session(session_path):
+    '''Average the numeric performance values of a session file, per module and metric.
+       Textual values (e.g., signal detection outcomes) are counted instead.'''
+    values = dict()
+    with open(session_path, 'r', newline='') as session_file:
+        for row in DictReader(session_file):
+            if row['type'] == 'performance':
+                values.setdefault(f"{row['module']}_{row['address']}", list()).append(row['value'])
+
+    summary = dict()
+    for metric, metric_values in values.items():
+        numbers = list()
+        for value in metric_values:
+            try:
+                numbers.append(float(value))
+            except ValueError:
+                pass
+        if len(numbers) > 0:
+            # Undefined values (nan) are not averaged, and are not valid JSON
+            numbers = [n for n in numbers if isfinite(n)]
+            summary[metric] = sum(numbers) / len(numbers) if len(numbers) > 0 else None
+        else:
+            summary[metric] = dict(Counter(metric_values))
+    return summary
+
+
+def run_simulation(run):
+    '''Play one scenario in headless mode in this (fresh) process'''
+    sys.argv = ['main.py', '--headless', '--speed', 'max']
+    if run['seed'] is not None:
+        sys.argv += ['--seed', str(run['seed'])]
+
+    # Core modules read the command line when imported
+    from core.constants import CONFIG
+    CONFIG['Openmatb']['scenario_path'] = run['scenario_path']
+
+    from core import Scheduler
+    from core.logger import logger
+    from core.headless import HeadlessWindow
+
+    HeadlessWindow()
+    try:
+        Scheduler()
+    except SystemExit:  # The scheduler exits the program at the end of the scenario
+        pass
+
+    return dict(session_id=logger.session_id, session_path=str(logger.path),
+                metrics=summarize_session(logger.path))
+
+
+def run_indexed_simulation(indexed_run):
+    '''Run a simulation, and return its result (or its error) along with the run index'''
+    index, run = indexed_run
+    try:
+        return index, run_simulation(run)
+    except Exception as e:
+        return index, dict(error=repr(e))
+
+
+def write_grid_scenario(scenario_path, parameters, index):
+    '''Write a copy of the scenario, with the parameters set at its beginning'''
+    lines = SCENARIOS_PATH.joinpath(scenario_path).open('r', encoding='utf8').readlines()
+
+    # The initial values of the scenario are replaced by the grid ones
+    swept = [f'0:00:00;{name}' for name in parameters]
+    lines = [l for l in lines if ';'.join(l.strip().split(';')[:3]) not in swept]
+    set_lines = [f'0:00:00;{name};{value}\n' for name, value in parameters.items()]
+
+    # Written out of the scenarios folder (an absolute scenario path is used as is)
+    grid_path = SESSIONS_PATH.joinpath('batch', f'{Path(scenario_path).stem}_{index}.txt').resolve()
+    grid_path.parent.mkdir(parents=True, exist_ok=True)
+    grid_path.write_text(''.join(set_lines + lines), encoding='utf8')
+    return str(grid_path)
+
+
+def get_runs(scenarios, seeds, grid):
+    names = list(grid.keys())
+    combinations = [dict(zip(names, values)) for values in product(*grid.values())]
+
+    runs = list()
+    for scenario_path, seed, parameters in product(scenarios, seeds, combinations):
+        run = dict(scenario=scenario_path, scenario_path=scenario_path, seed=seed,
+                   parameters=parameters)
+        if len(parameters) > 0:
+            run['scenario_path'] = write_grid_scenario(scenario_path, parameters, len(runs))
+        runs.append(run)
+    return runs
+
+
+def main():
+    parser = ArgumentParser(description=_('Run headless OpenMATB simulations in parallel'))
+    parser.add_argument('scenarios', nargs='+')
+    parser.add_argument('--seeds', nargs='+', type=int, default=[None])
+    parser.add_argument('--grid', type=Path, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    grid = json.loads(args.grid.read_text()) if args.grid is not None else dict()
+    runs = get_runs(args.scenarios, args.seeds, grid)
+
+    # One (new) process per run: the logger and the scheduler are not meant to be reused
+    with get_context('spawn').Pool(args.workers, maxtasksperchild=1) as pool:
+        for n, (index, result) in enumerate(pool.imap_unordered(run_indexed_simulation,
+                                                                enumerate(runs)), 1):
+            run = runs[index]
+            run.update(result)
+            print(f"[{n}/{len(runs)}] {run['scenario_path']} (seed: {run['seed']}, "
+                  f"session: {run.get('session_id')}) {run.get('error', '')}")
+
+    SESSIONS_PATH.mkdir(exist_ok=True)
+    summary_path = SESSIONS_PATH.joinpath(f'batch_{datetime.now().strftime("%y%m%d_%H%M%S")}.json')
+    summary_path.write_text(json.dumps(runs, indent=2, default=str, allow_nan=False))
+    print(_('Summary written to %s') % summary_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+#! .venv/bin/python3
+
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+# Benchmarks of the hot paths: scheduler ticks, plugins computation, logger, log reader and
+# replay seeking. Everything runs headless (no window, see core/headless.py), each benchmark in
+# its own process (core modules hold singletons, like the logger). The results are written as
+# JSON, along with the commit and the machine, so runs can be compared.
+#
+# Usage: benchmarks/run.py [--durations S [S ...]] [--rows N] [--repeat N] [--output PATH]
+# - the scheduler is timed on generated scenarios of the given durations (all four tasks, with
+#   regular failures and prompts). Their sessions are then read and replayed (seek latencies).
+# - the logger is timed by writing N state rows, synchronously and asynchronously
+# Like batch.py, the benchmarks write their session files into the sessions folder. The generated
+# scenarios are written into a temporary folder.
+
+import gettext, os, sys, json, platform, subprocess
+from argparse import ArgumentParser
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+# Paths are relative to the OpenMATB folder, wherever the benchmarks are launched from
+APP_PATH = Path(__file__).resolve().parent.parent
+os.chdir(APP_PATH)
+sys.path.insert(0, str(APP_PATH))
+
+# pyglet must not create its hidden shadow window (it needs a display), neither in this process
+# nor in the workers (which import this module first)
+import pyglet
+pyglet.options['shadow_window'] = False
+
+# The core package is only imported by the workers: importing it opens a new session file
+SESSIONS_PATH = Path('.', 'sessions')
+BENCHMARK_PLUGINS = ['sysmon', 'resman', 'track', 'communications']
+
+LOCALE_PATH = Path('.', 'locales')
+language_iso = [l for l in open('config.ini', 'r').readlines()
+                if 'language=' in l][0].split('=')[-1].strip()
+language = gettext.translation('openmatb', LOCALE_PATH, [language_iso])
+language.install()
+
+
+def hms(seconds):
+    return f'{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}'
+
+
+def write_benchmark_scenario(duration, scenarios_folder):
+    '''Write a scenario of <duration> seconds, which regularly solicits the four tasks'''
+    lines = ['0:00:00;communications;voicegender;male', '0:00:00;communications;voiceidiom;english']
+    lines += [f'0:00:00;{plugin};start' for plugin in BENCHMARK_PLUGINS]
+    for time_sec in range(10, duration, 10):
+        scale = time_sec // 10 % 4 + 1
+        lines.append(f'{hms(time_sec)};sysmon;scales-{scale}-failure;True')
+        if time_sec % 30 == 0:
+            prompt = 'own' if time_sec % 60 == 0 else 'other'
+            lines.append(f'{hms(time_sec)};communications;radioprompt;{prompt}')
+        if time_sec % 40 == 0:
+            lines.append(f'{hms(time_sec)};resman;pump-{time_sec // 40 % 8 + 1}-state;failure')
+        elif time_sec % 40 == 20:
+            lines.append(f'{hms(time_sec)};resman;pump-{time_sec // 40 % 8 + 1}-state;off')
+    lines += [f'{hms(duration)};{plugin};stop' for plugin in BENCHMARK_PLUGINS]
+
+    # An absolute scenario path is used as is (out of the scenarios folder)
+    scenario_path = Path(scenarios_folder, f'benchmark_{duration}.txt').resolve()
+    scenario_path.write_text('\n'.join(lines) + '\n', encoding='utf8')
+    return str(scenario_path), len(lines)
+
+
+def get_session_size(session_path):
+    with open(session_path, 'r', newline='') as session_file:
+        rows_n = sum(1 for row in session_file) - 1  # Header
+    return dict(rows=rows_n, bytes=Path(session_path).stat().st_size)
+
+
+def run_scheduler(duration, scenarios_folder):
+    '''Play a generated scenario as fast as possible, with the profiler enabled'''
+    scenario_path, events_n = write_benchmark_scenario(duration, scenarios_folder)
+    sys.argv = ['main.py', '--headless', '--speed', 'max', '--seed', '1']
+
+    # Core modules read the command line when imported
+    from core.constants import CONFIG, HEADLESS_FRAME_DURATION
+    CONFIG['Openmatb']['scenario_path'] = scenario_path
+
+    from core import Scheduler
+    from core.logger import logger
+    from core.headless import HeadlessWindow
+    from core.profiler import profiler
+
+    class CountingScheduler(Scheduler):
+        ticks = 0
+
+        def update(self, dt):
+            CountingScheduler.ticks += 1
+            super().update(dt)
+
+    profiler.enabled = True
+    HeadlessWindow()
+    start = perf_counter()
+    try:
+        CountingScheduler()
+    except SystemExit:  # The scheduler exits the program at the end of the scenario
+        pass
+    wall_s = perf_counter() - start
+
+    timings = profiler.get_summary()
+    return dict(duration=duration, events=events_n, ticks=CountingScheduler.ticks,
+                simulated_s=CountingScheduler.ticks * HEADLESS_FRAME_DURATION, wall_s=wall_s,
+                tick_us=wall_s / CountingScheduler.ticks * 1e6,
+                session_id=logger.session_id, session=get_session_size(logger.path),
+                plugins={p: timings.get(f'{p}.compute_next_plugin_state')
+                         for p in BENCHMARK_PLUGINS},
+                timings=timings)
+
+
+def run_replay(session_id, repeat):
+    '''Read a session <repeat> times, then replay it and seek through it'''
+    sys.argv = ['main.py', '-r', str(session_id), '--headless']
+
+    from core import ReplayScheduler, LogReader
+    from core.headless import HeadlessWindow
+
+    # The session is parsed from the CSV file, or restored from its cache (reload)
+    reader = LogReader(session_id)
+    parse_s, load_s = list(), list()
+    for i in range(repeat):
+        start = perf_counter()
+        reader.parse_session()
+        parse_s.append(perf_counter() - start)
+
+        start = perf_counter()
+        reader.reload_session()
+        load_s.append(perf_counter() - start)
+
+    seeks = list()
+
+    class SeekingReplayScheduler(ReplayScheduler):
+        # Seek forward (from keyframe to keyframe), then backward (from the captured keyframes)
+        fractions = [0.25, 0.5, 0.75, 1, 0.1, 0.6, 0.3, 0.9]
+
+        def update(self, dt):
+            super().update(dt)
+            if self.clock.isFastForward:  # Ticks of a seek
+                return
+
+            for fraction in self.fractions:
+                from_time, start = self.scenario_time, perf_counter()
+                self.set_target_time(self.logreader.duration_sec * fraction)
+                seeks.append(dict(from_time=from_time, to_time=self.scenario_time,
+                                  latency_s=perf_counter() - start))
+            self.exit()
+
+    HeadlessWindow()
+    try:
+        SeekingReplayScheduler()
+    except SystemExit:
+        pass
+
+    session = get_session_size(reader.session_file_path)
+    return dict(session_id=session_id, session=session, parse_s=min(parse_s),
+                load_s=min(load_s), rows_per_s=session['rows'] / min(parse_s), seeks=seeks)
+
+
+def run_logger(rows_n, asynchronous):
+    '''Record state rows, then close the session file (the remaining rows are written)'''
+    sys.argv = ['main.py', '--headless']
+
+    from core.logger import logger
+    if asynchronous:
+        logger.asynchronous = True
+        logger.start_writer_thread()
+
+    start = perf_counter()
+    for i in range(rows_n):
+        logger.record_state('benchmark', 'value', i)
+    record_s = perf_counter() - start
+    logger.close()
+    total_s = perf_counter() - start
+
+    return dict(asynchronous=asynchronous, rows=rows_n, record_s=record_s, total_s=total_s,
+                rows_per_s=rows_n / total_s, session_id=logger.session_id)
+
+
+def run_isolated(function, *args):
+    '''Run a benchmark in a new process, alone (so the measures do not interfere)'''
+    with get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+        return pool.apply(function, args)
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_machine():
+    machine = dict(platform=platform.platform(), processor=platform.processor(),
+                   cpu_count=os.cpu_count(), python=platform.python_version(),
+                   pyglet=pyglet.version)
+    try:
+        import numpy
+        machine['numpy'] = numpy.__version__
+    except ImportError:
+        machine['numpy'] = None
+    return machine
+
+
+def main():
+    parser = ArgumentParser(description=_('Benchmark the OpenMATB hot paths (headless)'))
+    parser.add_argument('--durations', nargs='+', type=int, default=[60, 240, 960])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', type=Path, default=None)
+    args = parser.parse_args()
+
+    results = dict(date=datetime.now().isoformat(timespec='seconds'), commit=get_commit(),
+                   machine=get_machine(), options=dict(durations=args.durations, rows=args.rows,
+                                                       repeat=args.repeat),
+                   scheduler=list(), replay=list(), logger=list())
+
+    with TemporaryDirectory() as scenarios_folder:
+        for duration in args.durations:
+            run = run_isolated(run_scheduler, duration, scenarios_folder)
+            results['scheduler'].append(run)
+            print(f"scheduler ({duration} s): {run['tick_us']:.1f} µs/tick")
+
+    for run in list(results['scheduler']):
+        replay = run_isolated(run_replay, run['session_id'], args.repeat)
+        results['replay'].append(replay)
+        print(f"replay ({run['duration']} s): parsed in {replay['parse_s']:.3f} s "
+              f"(cached: {replay['load_s']:.3f} s), "
+              f"{len(replay['seeks'])} seeks in {sum(s['latency_s'] for s in replay['seeks']):.3f} s")
+
+    for asynchronous in [False, True]:
+        run = run_isolated(run_logger, args.rows, asynchronous)
+        results['logger'].append(run)
+        print(f"logger (asynchronous: {asynchronous}): {run['rows_per_s']:.0f} rows/s")
+
+    SESSIONS_PATH.mkdir(exist_ok=True)
+    output_path = args.output or SESSIONS_PATH.joinpath(
+        f'benchmarks_{datetime.now().strftime("%y%m%d_%H%M%S")}.json')
+    output_path.write_text(json.dumps(results, indent=2, default=str))
+    print(_('Results written to %s') % output_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,6 +3,7 @@
 # License : CeCILL, version 2.1 (see the LICENSE file)
 
 import pyglet.clock
+from time import perf_counter, sleep
 
 class Clock(pyglet.clock.Clock):
     """
@@ -68,4 +69,19 @@ class Clock(pyglet.clock.Clock):
 
             target_time -= dt
 
-        self.isFastForward = False
\ No newline at end of file
+        self.isFastForward = False
+
+
+    def run_headless(self, frame_duration: float, speed: float = None):
+        '''Tick the clock by fixed frame durations, without any window event loop.
+           Run as fast as possible, or <speed> times faster than the real time.
+           Ends when a scheduled function exits the program.'''
+        start = perf_counter()
+        while True:
+            self.set_time(self.get_time() + frame_duration)
+            self.tick()
+
+            if speed is not None:
+                delay = self.get_time() / speed - (perf_counter() - start)
+                if delay > 0:
+                    sleep(delay)
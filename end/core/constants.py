@@ -10,6 +10,15 @@ import configparser
 REPLAY_MODE = len(sys.argv) > 1 and sys.argv[1] == '-r'
 REPLAY_STRIP_PROPORTION = 0.08
 
+# Headless mode: no window, the scenario is simulated with a virtual clock
+# (in replay, the whole session is replayed at once)
+HEADLESS_MODE = '--headless' in sys.argv
+HEADLESS_SCREEN_SIZE = (1920, 1080)
+HEADLESS_FRAME_DURATION = 1 / 60  # Emulate a 60 Hz display
+
+# The window is only redrawn when its content has changed, and at least every second
+FORCED_REDRAW_INTERVAL = 1
+
 C = COLORS = dict(WHITE=(255, 255, 255, 255),
                   WHITE_TRANSLUCENT=(255, 255, 255, 235),
                   BLACK=(50, 50, 50, 255),
@@ -41,6 +50,7 @@ PATHS.update({k.upper():Path('.', 'includes', k)
 
 [path.mkdir(parents=False, exist_ok=True) for p, path in PATHS.items() if path.exists() is False]
 PATHS['SCENARIO_ERRORS'] = Path('.', 'last_scenario_errors.log')
+PATHS['SESSION_INDEX'] = PATHS['SESSIONS'].joinpath('session_index.json')
 
 # Read the configuration file
 CONFIG = configparser.ConfigParser()
@@ -0,0 +1,118 @@
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+# Arrays version of the resources management network (tanks linked by pumps)
+# The topology is indexed once: each pump is a (from tank, to tank) pair of indices, i.e., a
+# sparse pump -> tank incidence matrix. At each step, the dynamic values (levels, capacities,
+# flows, pumps states...) are read from the plugin parameters into arrays, updated with NumPy,
+# and the new levels and pumps states are written back, so the parameters stay the reference
+# for the scenario, the keyboard and the widgets.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+PUMP_STATES = ['off', 'on', 'failure']
+OFF, ON, FAILURE = range(len(PUMP_STATES))
+
+
+class FlowNetwork:
+    def __init__(self, tanks, pumps):
+        self.tank_names = list(tanks.keys())
+        self.pump_names = list(pumps.keys())
+
+        tank_index = {name: i for i, name in enumerate(self.tank_names)}
+        self.from_tank = numpy.array([tank_index[pumps[p]['_fromtank']] for p in self.pump_names],
+                                     dtype=numpy.intp)
+        self.to_tank = numpy.array([tank_index[pumps[p]['_totank']] for p in self.pump_names],
+                                   dtype=numpy.intp)
+
+
+    def read(self, tanks, pumps):
+        tanks = [tanks[t] for t in self.tank_names]
+        pumps = [pumps[p] for p in self.pump_names]
+
+        self.level = numpy.array([t['level'] for t in tanks], dtype=numpy.int64)
+        self.max = numpy.array([t['max'] for t in tanks], dtype=numpy.int64)
+        self.target = numpy.array([numpy.nan if t['target'] is None else t['target'] for t in tanks],
+                                  dtype=float)
+        self.depletable = numpy.array([bool(t['depletable']) for t in tanks], dtype=bool)
+        self.loss = numpy.array([t['lossperminute'] for t in tanks], dtype=float)
+
+        self.flow = numpy.array([int(p['flow']) for p in pumps], dtype=float)
+        self.state = numpy.array([PUMP_STATES.index(p['state']) for p in pumps], dtype=numpy.int8)
+
+
+    def write(self, tanks, pumps):
+        for name, level in zip(self.tank_names, self.level.tolist()):
+            tanks[name]['level'] = level
+        for name, state in zip(self.pump_names, self.state.tolist()):
+            pumps[name]['state'] = PUMP_STATES[state]
+
+
+    def solve(self):
+        '''Automatic solver: three heuristics, applied to working pumps'''
+        working = self.state != FAILURE
+        from_level, to_level = self.level[self.from_tank], self.level[self.to_tank]
+        from_target, to_target = self.target[self.from_tank], self.target[self.to_tank]
+        to_has_target = ~numpy.isnan(to_target)
+
+        # 1. Systematically activate pumps draining non-depletable tanks
+        self.state[working & ~self.depletable[self.from_tank] & (self.state == OFF)] = ON
+
+        # 2. Activate/deactivate pump whose target tank is too low/high
+        self.state[working & to_has_target & (to_level <= to_target - 50)] = ON
+        self.state[working & to_has_target & (to_level >= to_target + 50)] = OFF
+
+        # 3. Equilibrate between two target tanks if sufficient level
+        both_targets = working & to_has_target & ~numpy.isnan(from_target)
+        equilibrate = (from_level >= to_target) & (to_target >= to_level)
+        self.state[both_targets & equilibrate] = ON
+        self.state[both_targets & ~equilibrate] = OFF
+
+
+    def deplete(self, time_resolution):
+        '''Deplete target tanks'''
+        loss = numpy.trunc(self.loss * time_resolution).astype(numpy.int64)
+        loss = numpy.minimum(loss, self.level)
+        self.level -= numpy.where(numpy.isnan(self.target), 0, loss)
+
+
+    def transfer(self, time_resolution):
+        '''Transfer the flow of each pump that is on'''
+        on = numpy.flatnonzero(self.state == ON)
+        volume = self.flow[on] * time_resolution
+        from_tank, to_tank = self.from_tank[on], self.to_tank[on]
+        n = len(self.tank_names)
+
+        # If no tank can get empty or full whatever the order of the pumps, the transfers are
+        # independent and can be summed up per tank
+        drained = numpy.bincount(from_tank, weights=volume, minlength=n)
+        filled = numpy.bincount(to_tank, weights=numpy.trunc(volume), minlength=n)
+        if numpy.all(self.level >= drained) and numpy.all(self.level + filled <= self.max):
+            volume = numpy.trunc(volume)
+            depleted = volume * self.depletable[from_tank]
+            self.level -= numpy.bincount(from_tank, weights=depleted, minlength=n).astype(numpy.int64)
+            self.level += numpy.bincount(to_tank, weights=volume, minlength=n).astype(numpy.int64)
+            return
+
+        # Else, the pumps transfer one after the other, limited by the available volumes
+        level, max_level = self.level.tolist(), self.max.tolist()
+        depletable = self.depletable.tolist()
+        for volume, f, t in zip(volume.tolist(), from_tank.tolist(), to_tank.tolist()):
+            volume = min(volume, level[f])
+            if depletable[f]:
+                level[f] -= int(volume)
+            level[t] += min(int(volume), max_level[t] - level[t])
+        self.level = numpy.array(level, dtype=numpy.int64)
+
+
+    def deactivate_full_and_empty(self):
+        '''Deactivate (working) pumps that fill a full tank or drain an empty one'''
+        full = self.level >= self.max
+        empty = ~full & (self.level <= 0)
+        deactivate = full[self.to_tank] | empty[self.from_tank]
+        self.state[deactivate & (self.state != FAILURE)] = OFF
@@ -0,0 +1,78 @@
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+# Cached geometry templates for the widgets
+# Unit shapes (circles, circle strips) are computed once per number of points. A shape is then
+# obtained by scaling and translating its template, instead of recomputing every cosine and
+# sine pair. Templates are NumPy arrays if numpy is available (vectorized placement, written
+# straight into the vertex buffers), and tuples of (x, y) pairs otherwise.
+
+from math import cos, sin, pi
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+templates = dict()
+
+
+def get_template(name, points_n):
+    '''Return the (cached) template of a unit shape, as a sequence of (x, y) points'''
+    key = (name, points_n)
+    if key not in templates:
+        points = TEMPLATE_BUILDERS[name](points_n)
+        templates[key] = numpy.array(points, dtype=float) if numpy is not None else tuple(points)
+    return templates[key]
+
+
+def build_circle(points_n):
+    return [(cos(i*2*pi/points_n), sin(i*2*pi/points_n)) for i in range(points_n)]
+
+
+def build_circle_strip(points_n):
+    # Each point of the circle is joined to the next one, the last one to the first one
+    circle = build_circle(points_n)
+    strip = list()
+    for i in range(points_n):
+        strip.extend([circle[i], circle[(i+1) % points_n]])
+    return strip
+
+
+def build_crossed_circle_strip(points_n):
+    # A circle strip, plus an horizontal and a vertical diameter (tracking cursor)
+    return build_circle_strip(points_n) + [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+
+TEMPLATE_BUILDERS = dict(circle=build_circle, circle_strip=build_circle_strip,
+                         crossed_circle_strip=build_crossed_circle_strip)
+
+
+def place(name, points_n, center, radius):
+    '''Scale a unit shape by radius and translate it to center.
+       Return a flat vertices array (or list, without numpy)'''
+    template = get_template(name, points_n)
+    if numpy is not None:
+        return (template * radius + center).ravel()
+
+    cx, cy = center
+    vertices = list()
+    for x, y in template:
+        vertices.extend([x * radius + cx, y * radius + cy])
+    return vertices
+
+
+def to_list(vertices):
+    return vertices.tolist() if numpy is not None else list(vertices)
+
+
+def write_vertices(vertex_list, vertices):
+    '''Replace the vertices of a vertex list. A NumPy array is copied directly into the
+       mapped (ctypes) buffer of a pyglet vertex list'''
+    buffer = vertex_list.vertices
+    if numpy is not None and not isinstance(buffer, list):
+        numpy.ctypeslib.as_array(buffer)[:] = vertices
+    else:
+        vertex_list.vertices = to_list(vertices)
@@ -1,7 +1,7 @@
 import pyglet.input
 from core.logger import logger
 from core.error import errors
-from core.constants import Group as G, COLORS as C, FONT_SIZES as F, REPLAY_MODE
+from core.constants import Group as G, COLORS as C, FONT_SIZES as F, REPLAY_MODE, HEADLESS_MODE
 
 hat_sides = ['LEFT', 'UP', 'RIGHT', 'DOWN']
 
@@ -89,10 +89,10 @@ class Joystick:
 
 
 joykey, joystick = None, None
-# Search and find a joystick
-joysticks = pyglet.input.get_joysticks()
+# Search and find a joystick (no input device is used in headless mode)
+joysticks = pyglet.input.get_joysticks() if not HEADLESS_MODE else list()
 
-if not REPLAY_MODE:
+if not REPLAY_MODE and not HEADLESS_MODE:
     if len(joysticks) > 0:
         joystick_device = joysticks[0]
         joystick = Joystick(joystick_device)
@@ -2,17 +2,67 @@
 # Institut National Universitaire Champollion (Albi, France).
 # License : CeCILL, version 2.1 (see the LICENSE file)
 
-import csv, sys
+import ast, csv, io, os, pickle, sys
+from bisect import bisect_right
+from collections import namedtuple
 from pathlib import Path
 from core.constants import PATHS as P
 from core.error import errors
 from core.scenario import Scenario
 from core.event import Event
 from core.utils import find_the_last_session_number
-from core.utils import get_replay_session_id
+from core.utils import get_replay_session_id, sign_payload, get_signed_payload
 # Some plugins must not be replayed for now
 IGNORE_PLUGINS = ['labstreaminglayer', 'parallelport', 'genericscales', 'instructions']
 
+# Entries that the replay browses by time windows
+TIMED_ENTRIES = ['keyboard_inputs', 'joystick_inputs', 'states']
+
+# The parsed session is cached next to the session file (pickled), and reused as long as the
+# session file has the same modification time and size. The cache is signed (see core.utils),
+# and is only unpickled if it was written by this installation.
+CACHE_SUFFIX = '_replay.pickle'
+CACHE_VERSION = 1  # To increment when the cached entries change
+CACHE_PROTOCOL = 5
+CACHED_ATTRIBUTES = ['contents', 'inputs', 'keyboard_inputs', 'joystick_inputs', 'states',
+                     'start_sec', 'end_sec', 'duration_sec', 'line_n']
+
+# A compact session entry (only what the replay needs)
+Entry = namedtuple('Entry', ['scenario_time', 'module', 'address', 'value'])
+
+
+def iter_session_rows(session_path):
+    '''Yield the (scenario_time, type, module, address, value) rows of a session file, one by
+       one. Repeated strings (types, modules and addresses) are shared.'''
+    with open(session_path, newline='') as csvfile:
+        reader = csv.reader(csvfile)
+        header = next(reader)
+        columns = [header.index(name) for name in ['scenario_time', 'type', 'module',
+                                                   'address', 'value']]
+        for row in reader:
+            scenario_time, row_type, module, address, value = [row[c] for c in columns]
+            yield (float(scenario_time), sys.intern(row_type), sys.intern(module),
+                   sys.intern(address), value)
+
+
+def parse_number(string):
+    try:
+        return int(string)
+    except ValueError:
+        return float(string)
+
+
+def parse_state_value(string):
+    '''Type a logged state value without evaluating it: numbers and tuples of numbers (the
+       most frequent ones) are parsed directly, other literals by ast.literal_eval'''
+    try:
+        if string.startswith('(') and string.endswith(')'):
+            return tuple(parse_number(s) for s in string[1:-1].split(',') if s.strip() != '')
+        return parse_number(string)
+    except ValueError:
+        return ast.literal_eval(string)
+
+
 class LogReader():
     '''
     The log reader takes a session file as input and is able to return its entries depending on
@@ -43,53 +93,115 @@ class LogReader():
         if self.session_file_path is None:
             return
 
+        # A session is parsed once, then restored from its sidecar cache
+        if not self.load_cache():
+            self.parse_session()
+            self.write_cache()
+
+        # Sorted scenario times of the timed entries (rows are logged chronologically)
+        self.times = {name: [entry.scenario_time for entry in getattr(self, name)]
+                      for name in TIMED_ENTRIES}
+
+
+    def parse_session(self):
         self.contents, self.inputs, self.states = [], [], []
         self.start_sec, self.end_sec, self.duration_sec = 0, 0, 0
         self.line_n = 0
         self.keyboard_inputs = []
         self.joystick_inputs = []
 
-        with open(self.session_file_path, newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            first_row = next(reader)
-            for row in reader:
-                # Define what type of entry must be retrieved for replaying
-                if not row['module'] in IGNORE_PLUGINS:
-                    row['logtime'] = float(row['logtime'])
-
-                    # Event case
-                    if row['type'] == 'event':
-                        self.contents.append(self.session_event_to_str(row))
-
-                    # Input case
-                    elif row['type'] == 'input':
-                        self.inputs.append(row)
-                        if row['module'] == 'keyboard':
-                            self.keyboard_inputs.append(row)
-                        elif 'joystick' in row['address']:
-                            self.joystick_inputs.append(row)
-
-                    # State case
-                    elif row['type'] == 'state':
-                        # Record communications radio frequencies
-                        # AND track cursor positions
-                        if ('radio_frequency' in row['address']
-                                or 'cursor_proportional' in row['address']
-                                or 'slider_' in row['address']):
-                            row['value'] = eval(row['value'])
-                            self.states.append(row)
-
-            # The last row browsed contains the ending time
-            self.end_sec = float(row['scenario_time'])
-            self.duration_sec = self.end_sec - self.start_sec
-
-    def session_event_to_str(self, event_row):
-        time_sec = int(float(event_row['scenario_time']))
-        plugin = event_row['module']
-        if event_row['address'] == 'self':
-            command = event_row['value']
+        rows = iter_session_rows(self.session_file_path)
+        scenario_time = next(rows)[0]  # The first row is not replayed
+        for scenario_time, row_type, module, address, value in rows:
+            # Define what type of entry must be retrieved for replaying
+            if module in IGNORE_PLUGINS:
+                continue
+
+            # Event case
+            if row_type == 'event':
+                self.contents.append(self.session_event_to_str(scenario_time, module, address, value))
+
+            # Input case
+            elif row_type == 'input':
+                entry = Entry(scenario_time, module, address, value)
+                self.inputs.append(entry)
+                if module == 'keyboard':
+                    self.keyboard_inputs.append(entry)
+                elif 'joystick' in address:
+                    self.joystick_inputs.append(entry)
+
+            # State case
+            elif row_type == 'state':
+                # Record communications radio frequencies
+                # AND track cursor positions
+                if ('radio_frequency' in address
+                        or 'cursor_proportional' in address
+                        or 'slider_' in address):
+                    self.states.append(Entry(scenario_time, module, address,
+                                             parse_state_value(value)))
+
+        # The last row browsed contains the ending time
+        self.end_sec = scenario_time
+        self.duration_sec = self.end_sec - self.start_sec
+
+
+    def get_cache_path(self):
+        return self.session_file_path.with_name(f'{self.session_file_path.stem}{CACHE_SUFFIX}')
+
+
+    def get_cache_key(self):
+        # The cache is outdated as soon as the session file (or the cache format) changes
+        stat = self.session_file_path.stat()
+        return (CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+
+
+    def load_cache(self):
+        try:
+            payload = get_signed_payload(self.get_cache_path().read_bytes())
+            if payload is None:
+                return False  # Not written by this installation
+
+            cache_file = io.BytesIO(payload)
+            if pickle.load(cache_file) != self.get_cache_key():
+                return False
+            self.__dict__.update(pickle.load(cache_file))
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            return False
+        return True
+
+
+    def write_cache(self):
+        # The key and the entries are pickled one after the other, so the key is checked first
+        cache_file = io.BytesIO()
+        pickle.dump(self.get_cache_key(), cache_file, protocol=CACHE_PROTOCOL)
+        pickle.dump({name: getattr(self, name) for name in CACHED_ATTRIBUTES},
+                    cache_file, protocol=CACHE_PROTOCOL)
+        data = sign_payload(cache_file.getvalue())
+        if data is None:
+            return
+
+        # Each process writes its own temporary file, then replaces the cache atomically
+        cache_path = self.get_cache_path()
+        temp_path = cache_path.with_name(f'{cache_path.name}.{os.getpid()}.tmp')
+        try:
+            temp_path.write_bytes(data)
+            temp_path.replace(cache_path)
+        except OSError:  # E.g., a read-only sessions folder: the session will be parsed again
+            pass
+
+
+    def get_rows_between(self, entries_name, start_time, end_time):
+        '''Return the entries whose scenario_time is in ]start_time, end_time]'''
+        times = self.times[entries_name]
+        return getattr(self, entries_name)[bisect_right(times, start_time):
+                                           bisect_right(times, end_time)]
+
+    def session_event_to_str(self, scenario_time, plugin, address, value):
+        time_sec = int(scenario_time)
+        if address == 'self':
+            command = value
         else:
-            command = ';'.join([event_row['address'], event_row['value']])
+            command = ';'.join([address, value])
 
         event = Event(self.line_n, time_sec, plugin, command)
         self.line_n += 1
@@ -0,0 +1,110 @@
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+# Profiling mode (profiling=True in config.ini)
+# The duration of each scheduler update phase, of each plugin computation and widgets refresh,
+# and of the windows drawing are recorded (perf_counter_ns) into ring buffers, along with the
+# frame time (the interval between two scheduler updates). The percentiles can be displayed
+# over the window (F12 key), and a summary is written next to the session file at exit.
+
+import json
+from collections import deque
+from time import perf_counter, perf_counter_ns
+from core.utils import has_conf_value, get_conf_value
+
+PROFILE_WINDOW = 3600  # Number of measures kept per timing (1 minute of frames at 60 Hz)
+OVERLAY_INTERVAL = 0.5  # Seconds between two refreshes of the overlay
+PERCENTILES = [50, 95, 99]
+
+
+def get_percentiles(durations, percentiles=PERCENTILES):
+    '''Nearest-rank percentiles of a sequence of durations'''
+    durations = sorted(durations)
+    return [durations[min(len(durations) - 1, int(len(durations) * p / 100))]
+            for p in percentiles]
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = (has_conf_value('Openmatb', 'profiling')
+                        and get_conf_value('Openmatb', 'profiling'))
+        self.timings = dict()  # (group, name): deque of durations (ns)
+        self.last_frame = None
+
+        self.overlay = False
+        self.overlay_text = ''
+        self.overlay_time = 0
+
+
+    def record(self, name, duration):
+        if name not in self.timings:
+            self.timings[name] = deque(maxlen=PROFILE_WINDOW)
+        self.timings[name].append(duration)
+
+
+    def measure(self, name, method, *args):
+        '''Call the method, and record its duration if the profiling is enabled'''
+        if not self.enabled:
+            return method(*args)
+
+        start = perf_counter_ns()
+        result = method(*args)
+        self.record(name, perf_counter_ns() - start)
+        return result
+
+
+    def new_frame(self):
+        if not self.enabled:
+            return
+
+        now = perf_counter_ns()
+        if self.last_frame is not None:
+            self.record(('frame', 'time'), now - self.last_frame)
+        self.last_frame = now
+
+
+    def get_summary(self):
+        '''Number of measures, mean, percentiles and maximum of each timing, in milliseconds'''
+        summary = dict()
+        for (group, name), durations in self.timings.items():
+            if len(durations) == 0:
+                continue
+            timing = dict(n=len(durations), mean=sum(durations) / len(durations) / 1e6)
+            for p, value in zip(PERCENTILES, get_percentiles(durations)):
+                timing[f'p{p}'] = value / 1e6
+            timing['max'] = max(durations) / 1e6
+            summary[f'{group}.{name}'] = timing
+        return summary
+
+
+    def toggle_overlay(self):
+        self.overlay = self.enabled and not self.overlay
+        self.overlay_time = 0
+
+
+    def is_overlay_outdated(self):
+        return self.overlay and perf_counter() - self.overlay_time > OVERLAY_INTERVAL
+
+
+    def get_overlay_text(self):
+        if self.is_overlay_outdated():
+            lines = ['{:<36}{:>8}{:>8}{:>8}'.format(_('Timing (ms)'), *[f'p{p}' for p in PERCENTILES])]
+            for name, timing in self.get_summary().items():
+                lines.append('{:<36}{:>8.2f}{:>8.2f}{:>8.2f}'.format(
+                    name, *[timing[f'p{p}'] for p in PERCENTILES]))
+            self.overlay_text = '\n'.join(lines)
+            self.overlay_time = perf_counter()
+        return self.overlay_text
+
+
+    def write_summary(self, session_path):
+        if not self.enabled or len(self.timings) == 0:
+            return
+
+        summary_path = session_path.with_name(f'{session_path.stem}_profile.json')
+        summary_path.write_text(json.dumps(self.get_summary(), indent=2))
+        print(_('Profiling summary written to %s') % summary_path)
+
+
+profiler = Profiler()
@@ -20,15 +20,19 @@ from pyglet.window import key
 from core.scheduler import Scheduler
 from core.error import errors
 from core.widgets import PlayPause, Simpletext, Slider, Frame, Reticle, SimpleHTML
-from core.constants import COLORS as C, FONT_SIZES as F
+from core.constants import COLORS as C, FONT_SIZES as F, HEADLESS_MODE
+from core.logger import logger
 from time import strftime, gmtime, sleep
 from core.logreader import LogReader
+from core.keyframe import Keyframe
 from core.container import Container
 from core.utils import get_conf_value, get_replay_session_id, clamp
 from random import uniform
 from core.window import Window
 
 CLOCK_STEP = 0.1
+KEYFRAME_STEP = 30  # Seconds between two replay keyframes
+TIME_TOLERANCE = 1e-6  # Seconds under which the replay time is snapped to its target
 
 class ReplayScheduler(Scheduler):
     """
@@ -37,6 +41,7 @@ class ReplayScheduler(Scheduler):
     def __init__(self):
         self.logreader = None
         self.target_time = 0
+        self.keyframes = dict()  # Keyframe slot (scenario_time // KEYFRAME_STEP): Keyframe
 
         self.set_media_buttons()
 
@@ -53,9 +58,11 @@ class ReplayScheduler(Scheduler):
 
     def set_scenario(self):
         replay_session_id = get_replay_session_id()
+        new_session = self.logreader is None or replay_session_id != self.logreader.replay_session_id
 
-        if self.logreader is None or replay_session_id != self.logreader.replay_session_id:
+        if new_session:
             self.logreader = LogReader(replay_session_id)
+            self.keyframes = dict()
 
 ##            self.inputs_queue = list(self.logreader.inputs)  # Copy inputs
 ##            self.keyboard_inputs = [i for i in self.inputs_queue if i['module'] == 'keyboard']
@@ -69,7 +76,11 @@ class ReplayScheduler(Scheduler):
 
         self.slider.value_max = self.logreader.duration_sec
 
-        self.pause_scenario()
+        if HEADLESS_MODE and new_session:  # Nobody can press play: replay the whole session
+            self.toggle_pause_to(False)
+            self.target_time = self.logreader.end_sec
+        else:
+            self.pause_scenario()
 
 
     def set_inputs_buttons(self):
@@ -158,6 +169,7 @@ class ReplayScheduler(Scheduler):
         self.emulate_keyboard_inputs()
         self.display_joystick_inputs()
         self.process_states()
+        self.capture_keyframe()
 
 
         #self.pause_if_clock_target_reached()
@@ -167,6 +179,17 @@ class ReplayScheduler(Scheduler):
 
 
 
+    def update_timers(self, dt):
+        super().update_timers(dt)
+
+        # The tick that reaches the target time lands exactly on it, whatever the rounding errors
+        # accumulated since the seek started (from zero or from a keyframe)
+        if not self.is_scenario_time_paused() \
+                and abs(self.target_time - self.scenario_time) < TIME_TOLERANCE:
+            self.scenario_time = self.target_time
+            logger.set_scenario_time(self.scenario_time)
+
+
     def check_plugins_alive(self):
         return all([p.alive for _, p in self.plugins.items()])
 
@@ -195,6 +218,8 @@ class ReplayScheduler(Scheduler):
 
     def pause_if_end_reached(self):
         if self.scenario_time >= self.logreader.end_sec and not self.is_scenario_time_paused():
+            if HEADLESS_MODE:
+                self.exit()
             self.pause_scenario()
 
 
@@ -260,10 +285,15 @@ class ReplayScheduler(Scheduler):
             return
 
 
-        # backward in time, we reload everything, reset, and move forward
-        if self.target_time < self.scenario_time:
+        # backward in time (or forward beyond a keyframe), we reload everything, reset,
+        # restore the nearest previous keyframe if any, and move forward
+        keyframe = self.get_keyframe_before(self.target_time)
+        if self.target_time < self.scenario_time or \
+                (keyframe is not None and keyframe.scenario_time > self.scenario_time):
             self.restart_scenario()
             self.scenario_time = 0
+            if keyframe is not None:
+                keyframe.restore(self)
 
         forward_time = self.target_time - self.scenario_time
 
@@ -292,26 +322,40 @@ class ReplayScheduler(Scheduler):
         self.clock.schedule(self.update)
 
 
+    def capture_keyframe(self):
+        # Capture one keyframe per KEYFRAME_STEP, as soon as the replay reaches it
+        # and all the plugins states can be saved
+        slot = int(self.scenario_time // KEYFRAME_STEP)
+        if slot > 0 and slot not in self.keyframes \
+                and all([p.can_capture_keyframe() for p in self.plugins.values()]):
+            self.keyframes[slot] = Keyframe(self)
+
+
+    def get_keyframe_before(self, target_time):
+        for slot in range(int(target_time // KEYFRAME_STEP), 0, -1):
+            if slot in self.keyframes and self.keyframes[slot].scenario_time <= target_time:
+                return self.keyframes[slot]
+
+
     def emulate_keyboard_inputs(self):
         self.keys_history = []
 
-        for input in self.logreader.keyboard_inputs:
-            # display actions from 0.5 secs before that time
-            if float(input['scenario_time']) > self.scenario_time - (0.5) and float(input['scenario_time']) <= self.scenario_time:
-
-                # execute actions if on time
-                if float(input['scenario_time']) == self.scenario_time:
-                    for plugin_name, plugin in self.plugins.items():
-                        plugin.do_on_key(input['address'], input['value'], True)
+        # display actions from 0.5 secs before that time
+        for input in self.logreader.get_rows_between('keyboard_inputs', self.scenario_time - 0.5,
+                                                     self.scenario_time):
+            # execute actions if on time
+            if input.scenario_time == self.scenario_time:
+                for plugin_name, plugin in self.plugins.items():
+                    plugin.do_on_key(input.address, input.value, True)
 
-                cmd = f"{input['address']} ({input['value']})"
-                if len(self.keys_history) > 0 and cmd != self.keys_history[-1]:
-                    self.keys_history.append(cmd)
-                elif len(self.keys_history) == 0:
-                    self.keys_history.append(cmd)
+            cmd = f"{input.address} ({input.value})"
+            if len(self.keys_history) > 0 and cmd != self.keys_history[-1]:
+                self.keys_history.append(cmd)
+            elif len(self.keys_history) == 0:
+                self.keys_history.append(cmd)
 
-                if len(self.keys_history) > 30:
-                    del self.keys_history[0]
+            if len(self.keys_history) > 30:
+                del self.keys_history[0]
 
 
         history_str = f"<strong>Keyboard history:\n</strong>" + '<br>'.join([kh for kh in self.keys_history])
@@ -328,47 +372,43 @@ class ReplayScheduler(Scheduler):
 
         # Get candidates states (and their index) for being displayed,
         # retrieve the most recent for each state category
-        past_sta = [(i,s) for i,s in enumerate(self.logreader.states)
-                    if float(s['scenario_time']) > self.scenario_time - CLOCK_STEP and float(s['scenario_time']) <= self.scenario_time]
+        past_sta = self.logreader.get_rows_between('states', self.scenario_time - CLOCK_STEP,
+                                                   self.scenario_time)
 
         if len(past_sta) == 0:
             return
 
-        for item in past_sta:
-            state = item[1]
-
+        for state in past_sta:
             # 1. Cursor position
-            if 'cursor_proportional' in state['address'] and 'track' in self.plugins:
-                cursor_relative = self.plugins['track'].reticle.proportional_to_relative(state['value'])
+            if 'cursor_proportional' in state.address and 'track' in self.plugins:
+                cursor_relative = self.plugins['track'].reticle.proportional_to_relative(state.value)
                 self.plugins['track'].cursor_position = cursor_relative
 
             # 2. Radio frequencies
-            elif 'radio_frequency' in state['address'] and 'communications' in self.plugins:
-                radio_name = state['address'].replace(', radio_frequency', '').replace('radio_', '')
+            elif 'radio_frequency' in state.address and 'communications' in self.plugins:
+                radio_name = state.address.replace(', radio_frequency', '').replace('radio_', '')
                 radio = self.plugins['communications'].get_radios_by_key_value('name', radio_name)[0]
-                radio['currentfreq'] = state['value']
+                radio['currentfreq'] = state.value
 
             # 3. Genericscales slider values
-            elif 'slider_' in state['address'] and 'genericscales' in self.plugins:
-                slider_name = state['address'].replace(', value', '')
+            elif 'slider_' in state.address and 'genericscales' in self.plugins:
+                slider_name = state.address.replace(', value', '')
                 slider = self.plugins['genericscales'].sliders[slider_name]
-                slider.groove_value = state['value']
+                slider.groove_value = state.value
 
 
     def display_joystick_inputs(self):
         x, y = None, None
-        past_joy = [(i,s) for i,s in enumerate(self.logreader.joystick_inputs)
-                    if float(s['scenario_time']) > self.scenario_time - CLOCK_STEP and float(s['scenario_time']) <= self.scenario_time]
-
-
-        for s in past_joy:
-            joy_input = s[1]
+        past_joy = self.logreader.get_rows_between('joystick_inputs',
+                                                   self.scenario_time - CLOCK_STEP,
+                                                   self.scenario_time)
 
+        for joy_input in past_joy:
             # X case
-            if '_x' in joy_input['address']:
-                x = float(joy_input['value'])
-            elif '_y' in joy_input['address']:
-                y = float(joy_input['value'])
+            if '_x' in joy_input.address:
+                x = float(joy_input.value)
+            elif '_y' in joy_input.address:
+                y = float(joy_input.value)
 
         if x is not None and y is not None:
             rel_x, rel_y = self.replay_reticle.proportional_to_relative((x,y))
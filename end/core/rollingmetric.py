@@ -0,0 +1,83 @@
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+# Performance values kept by the plugins (see AbstractPlugin.log_performance)
+# The full history of a metric is written to the session log only. In memory, a metric keeps
+# its last values in a fixed-size ring buffer, the number of occurrences of its textual values,
+# and a running sum over its last values, so the global performance is computed in O(1).
+
+from collections import deque, Counter
+from itertools import islice
+from math import isnan, nan
+
+WINDOW_SIZE = 3000  # Maximum number of values kept per metric (1 minute of tracking)
+
+
+def is_number(x):
+    return isinstance(x, (int, float))
+
+
+class RollingMetric:
+    def __init__(self, maxlen=WINDOW_SIZE):
+        self.values = deque(maxlen=maxlen)
+        self.count = 0            # Number of values since the beginning
+        self.counts = Counter()   # Occurrences of each textual value since the beginning
+
+        # Running sum of the last `window` numeric values (NaN are counted apart)
+        self.window = None
+        self.window_sum = 0
+        self.window_nans = 0
+
+
+    def __len__(self):
+        return self.count
+
+
+    def append(self, value):
+        if self.window is not None:
+            if len(self.values) >= self.window:  # A value leaves the window
+                self.add_to_window(self.values[-self.window], -1)
+            self.add_to_window(value, 1)
+
+        self.values.append(value)
+        self.count += 1
+        if isinstance(value, str):
+            self.counts[value] += 1
+
+
+    def add_to_window(self, value, sign):
+        if not is_number(value):
+            return
+        elif isnan(value):
+            self.window_nans += sign
+        else:
+            self.window_sum += sign * value
+
+
+    def get_last(self, n):
+        '''Return the n last values (at most the size of the ring buffer), oldest first'''
+        return list(islice(reversed(self.values), n))[::-1]
+
+
+    def get_mean(self, n):
+        '''Mean of the n last values. It is maintained incrementally as long as n is unchanged.'''
+        n = min(n, self.values.maxlen)
+        if n != self.window:
+            self.window, self.window_sum, self.window_nans = n, 0, 0
+            for value in self.get_last(n):
+                self.add_to_window(value, 1)
+
+        if self.window_nans > 0:
+            return nan
+        return self.window_sum / min(n, len(self.values))
+
+
+    def copy(self):
+        metric = RollingMetric(self.values.maxlen)
+        metric.values.extend(self.values)
+        metric.count = self.count
+        metric.counts = Counter(self.counts)
+        metric.window, metric.window_sum, metric.window_nans = \
+            self.window, self.window_sum, self.window_nans
+        return metric
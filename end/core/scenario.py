@@ -2,55 +2,183 @@
 # Institut National Universitaire Champollion (Albi, France).
 # License : CeCILL, version 2.1 (see the LICENSE file)
 
-import re
+import re, os, pickle
+from hashlib import sha256
+from pathlib import Path
 from pyglet.window import key as winkey
 from core.constants import PATHS as P, REPLAY_MODE, DEPRECATED
 from core.logger import logger
 from core.error import errors
-from core.utils import get_conf_value
+from core.utils import get_conf_value, sign_payload, get_signed_payload
+from core.joystick import joykey
 from core import validation
-from core.event import Event
+from core.event import Event, parse_scenario, get_parsed_events
 import plugins
 
 
+# Compiled scenarios: once a scenario has been checked, its validated events are kept (in memory,
+# and in the .compiled folder of the scenarios for scenario files), along with a hash of the
+# scenario and of the code that checks it (plugins, validation). They are reused as long as
+# this hash is unchanged, instead of checking the scenario again.
+# Compiled files are signed (see core.utils): a file that was not written by this installation
+# (e.g., copied along with a scenario) is ignored, and the scenario is checked again.
+COMPILED_PATH = P['SCENARIOS'].joinpath('.compiled')
+COMPILED_PROTOCOL = 5
+compiled_scenarios = dict()  # Hash: pickled validated events
+sources_hash = None
+
+
+def get_sources_hash():
+    '''Hash of what the validation depends on (computed once): its code (and the constants,
+       like colors), the keys of the plugged joystick, the pyglet keys names, and the names of
+       the files that the events can refer to (text files, sounds)'''
+    global sources_hash
+    if sources_hash is None:
+        core_path = Path(__file__).parent
+        sources = [core_path.joinpath(f) for f in ['constants.py', 'event.py', 'joystick.py',
+                                                   'scenario.py', 'utils.py', 'validation.py']]
+        sources += sorted(P['PLUGINS'].glob('*.py'))
+        digest = sha256()
+        for source in sources:
+            digest.update(source.read_bytes())
+        digest.update(str(sorted(joykey.keys()) if joykey is not None else None).encode())
+        digest.update(str(sorted(winkey._key_names.values())).encode())
+        for folder in [P['QUESTIONNAIRES'], P['INSTRUCTIONS'], P['SOUNDS']]:
+            digest.update(str(sorted(f.relative_to(folder).as_posix() for f in folder.glob('**/*')))
+                          .encode())
+        sources_hash = digest.hexdigest()
+    return sources_hash
+
+
+def get_scenario_hash(contents):
+    digest = sha256(get_sources_hash().encode())
+    digest.update(str(REPLAY_MODE).encode())  # Replays are checked differently
+    digest.update(''.join(contents).encode())
+    return digest.hexdigest()
+
+
+def load_compiled_events(scenario_hash, compiled_path=None):
+    '''Return fresh validated events if the scenario has been compiled, else None'''
+    if scenario_hash not in compiled_scenarios and compiled_path is not None:
+        try:
+            payload = get_signed_payload(compiled_path.read_bytes())
+            if payload is None:
+                return None
+            compiled_hash, compiled = pickle.loads(payload)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+            return None
+        if compiled_hash == scenario_hash:
+            compiled_scenarios[scenario_hash] = compiled
+
+    if scenario_hash not in compiled_scenarios:
+        return None
+
+    events = list()
+    for line, time_sec, plugin, command, line_str in pickle.loads(compiled_scenarios[scenario_hash]):
+        event = Event(line, time_sec, plugin, command)
+        event.line_str = line_str  # As written in the scenario (before the values validation)
+        events.append(event)
+    return events
+
+
+def save_compiled_events(scenario_hash, events, compiled_path=None):
+    compiled = pickle.dumps([(e.line, e.time_sec, e.plugin, e.command, e.line_str) for e in events],
+                            protocol=COMPILED_PROTOCOL)
+    compiled_scenarios[scenario_hash] = compiled
+    if compiled_path is None:
+        return
+
+    data = sign_payload(pickle.dumps((scenario_hash, compiled), protocol=COMPILED_PROTOCOL))
+    if data is None:
+        return
+
+    try:
+        compiled_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = compiled_path.with_name(f'{compiled_path.name}.{os.getpid()}.tmp')
+        temp_path.write_bytes(data)
+        temp_path.replace(compiled_path)
+    except OSError:  # The scenario will be checked again at next launch
+        pass
+
 
 class Scenario:
     '''
     This object converts scenario to Events, loads the corresponding plugins,
     and checks that some criteria are met (e.g., acceptable values)
+    In check_only mode (scenario linter), the scenario is only checked: its errors are kept
+    into check_errors, and nothing is logged, written or cached.
     '''
-    def __init__(self, contents=None):
+    def __init__(self, contents=None, check_only=False):
         self.events = list()
         self.plugins = dict()
+        compiled_path = None
+
+        if check_only:
+            self.check_errors = self.check_contents(contents, replay=False)
+            return
 
         if contents is None:
-            scenario_path = P['SCENARIOS'].joinpath(get_conf_value('Openmatb', 'scenario_path'))
+            scenario_name = get_conf_value('Openmatb', 'scenario_path')
+            scenario_path = P['SCENARIOS'].joinpath(scenario_name)
             if scenario_path.exists():
                 contents = open(scenario_path, 'r').readlines()
                 logger.log_manual_entry(scenario_path, key='scenario_path')
+                if not Path(scenario_name).is_absolute():
+                    compiled_path = COMPILED_PATH.joinpath(f'{scenario_name}.pickle')
             else:
                 errors.add_error(_('%s was not found') % str(scenario_path), fatal = True)
 
+        # A scenario that has already been checked is not checked again
+        self.hash = get_scenario_hash(contents)
+        compiled_events = load_compiled_events(self.hash, compiled_path)
+        if compiled_events is not None:
+            self.events = compiled_events
+            self.plugins = self.load_plugins()
+            self.write_errors([])
+            return
+
+        event_errors = self.check_contents(contents)
+        self.write_errors(event_errors)
+
+        if len(event_errors) > 0:
+            errors.add_error(_(f"There were some errors in the scenario. See the %s file.") % P['SCENARIO_ERRORS'].name, fatal = True)
+        else:
+            save_compiled_events(self.hash, self.events, compiled_path)
+
+
+    def check_contents(self, contents, replay=REPLAY_MODE):
+        '''Convert the scenario contents into events, load their plugins and check the events.
+           Return the list of errors.'''
         # Convert the scenario content into a list of events #
         # (Squeeze empty and commented [#] lines)
-        self.events = [Event.parse_from_string(line_n, line_str) for line_n, line_str
-                       in enumerate(contents)
-                       if len(line_str.strip()) > 0 and not line_str.startswith("#")]
+        self.events = list()
+        parsed = parse_scenario(contents)
+        if len(parsed.invalid_lines) > 0:  # The scenario can not be run
+            return [_('Error on line %s. This line is not a valid event '
+                      '(H:MM:SS;plugin;command).') % line_n for line_n in parsed.invalid_lines]
 
         # Next load the scheduled plugins into the class, so we can check potential errors
-        # But first, check that only available plugins are mentioned
-        for event in self.events:
-            if not hasattr(globals()['plugins'], event.plugin.capitalize()):
-                errors.add_error(_('Scenario error: %s is not a valid plugin name (l. %s)') % (event.plugin, event.line), fatal = True)
+        # But first, check that only available plugins are mentioned (each name is checked once)
+        invalid_ids = set([plugin_id for plugin_id, name in enumerate(parsed.plugins)
+                           if not hasattr(globals()['plugins'], name.capitalize())])
+        if len(invalid_ids) > 0:
+            return [_('Scenario error: %s is not a valid plugin name (l. %s)') % (parsed.plugins[plugin_id], line_n)
+                    for line_n, plugin_id in zip(parsed.lines, parsed.plugin_ids)
+                    if plugin_id in invalid_ids]
 
+        self.events = get_parsed_events(parsed)
+        self.plugins = self.load_plugins()
 
-        self.plugins = {name: getattr(globals()['plugins'], name.capitalize())()
-                        for name in self.get_plugins_name_list()}
+        self.events = self.events_retrocompatibility() # Apply retrocompatiblity to events
+        return self.check_events(replay)   # Check that events are properly expressed
 
 
-        self.events = self.events_retrocompatibility() # Apply retrocompatiblity to events
-        event_errors = self.check_events()   # Check that events are properly expressed
+    def load_plugins(self):
+        return {name: getattr(globals()['plugins'], name.capitalize())()
+                for name in self.get_plugins_name_list()}
+
 
+    def write_errors(self, event_errors):
         errorf = open(P['SCENARIO_ERRORS'],'w')
         if len(event_errors) > 0:
             for this_error in event_errors:
@@ -59,9 +187,6 @@ class Scenario:
             print(_('No error'), file=errorf)
         errorf.close()
 
-        if len(event_errors) > 0:
-            errors.add_error(_(f"There were some errors in the scenario. See the %s file.") % P['SCENARIO_ERRORS'].name, fatal = True)
-
 
     def reload_plugins(self):
         for name, plugin in self.plugins.items():
@@ -133,22 +258,32 @@ class Scenario:
         return [f for f in dir(self.plugins[plugin]) if callable(getattr(self.plugins[plugin], f))]
 
 
-    def get_plugin_events(self, plugin_name):
-        return [e for e in self.events if e.plugin == plugin_name]
+    def get_events_by_plugin(self):
+        events_by_plugin = dict()
+        for e in self.events:
+            events_by_plugin.setdefault(e.plugin, list()).append(e)
+        return events_by_plugin
 
 
-    def check_events(self):
+    def check_events(self, replay=REPLAY_MODE):
         errors = list()
 
+        # The events are checked in a single pass, against what is indexed once per plugin:
+        # its commands, methods and validation methods
+        events_by_plugin = self.get_events_by_plugin()
+        plugins_methods = {name: set(self.get_plugin_methods(name)) for name in self.plugins}
+        validation_dicts = {name: self.get_validation_dict(name) for name in self.plugins}
+
         # Rule 1 - all the mentioned plugins should have a start and a stop commands
         # Only non-blocking plugins must have a stop command
         for plug_name in self.get_plugins_name_list():
-            if not any(['start' in e.command for e in self.get_plugin_events(plug_name)]):
+            commands = set([c for e in events_by_plugin.get(plug_name, list()) for c in e.command])
+            if 'start' not in commands:
                 errors.append(_('The (%s) plugin does not have a start command.') % plug_name)
 
             if self.plugins[plug_name].blocking is False:
-                if REPLAY_MODE == False:
-                    if not any(['stop' in e.command for e in self.get_plugin_events(plug_name)]):
+                if replay == False:
+                    if 'stop' not in commands:
                         errors.append(_('The (%s) plugin does not have a stop command.') % plug_name)
                 else:
                     pass # Not a problem during a replay (because a scenario can have been exited
@@ -171,7 +306,7 @@ class Scenario:
             # Rule 3 - when present, a command should match either a plugin method or
             # a parameter, the value of the latter being acceptable
             elif len(e) == 1:  # Method expected
-                if e.command[0] not in self.get_plugin_methods(e.plugin):
+                if e.command[0] not in plugins_methods[e.plugin]:
                     errors.append(_('Error on line %s. Method (%s) is not available for the plugin'
                                     ' (%s)') % (e.line, e.command[0], e.plugin))
 
@@ -181,48 +316,32 @@ class Scenario:
 
                 # If the current parameter exists in the plugin
                 if exists == True:
-                    method_args = None
-
                     # Check that the parameter has a verification method
                     # either globally or in the plugins itself
                     # Else trigger a warning (should not happen)
-                    validation_dict = self.get_validation_dict(e.plugin)
+                    validation_dict = validation_dicts[e.plugin]
 
                     if e.command[0] in validation_dict:
-                        eval_method = validation_dict[e.command[0]]
-                    else:
-                        eval_method = None
-                        errors.append(_('Warning on line %s. Parameter (%s) has no verification'
-                                        ' method') % (e.line, e.command[0]))
-
-                    if eval_method is not None:
-                        if isinstance(eval_method, tuple):
-                            # Method-args will receive extra arguments
-                            eval_method, *method_args = eval_method
-
-                        # Remove potential blank spaces in the command argument
-                        # (except is the eval_method is waiting for a string, like title)
-                        if eval_method.__name__ != 'is_string':
-                            e.command[1] = e.command[1].replace(' ', '')
-
-                        # ...extra arguments are unpacked here if present
-                        method_args = (e.command[1], *method_args) if method_args is not None else (e.command[1],)
-                        eval_value, error = eval_method(*method_args)
-
+                        # Parse (never evaluate) the raw value into its typed version
+                        eval_value, error = validation.validate_value(validation_dict[e.command[0]],
+                                                                      e.command[1])
                         if error is not None:
                             preamble = _('Error on line %s. %s ') % (e.line, e.command[0])
                             error_msg = preamble + error
                             errors.append(error_msg)
                         else:
-                            # If no error, replace the event value by its evaluated version
+                            # If no error, replace the event value by its typed version
                             e.command[1] = eval_value
+                    else:
+                        errors.append(_('Warning on line %s. Parameter (%s) has no verification'
+                                        ' method') % (e.line, e.command[0]))
                 else:
                     errors.append(_('Error on line %s. The %s plugin does not have a %s parameter')
                                     % (e.line, e.plugin, e.command[-2]))
         return errors
 
     def get_validation_dict(self, pluginname):
-        validation_dict = global_validation_dict
+        validation_dict = dict(global_validation_dict)
 
         plugin_validation_dict = getattr(self.plugins[pluginname], 'validation_dict', None)
 
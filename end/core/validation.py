@@ -5,11 +5,72 @@
 # Validation methods
 # The following methods, associated with the valid_type dictionary, allows to check that
 # each scenario parameter value is accepted.
+# Values are parsed, never evaluated. As scenarios repeat the same values many times, the
+# result of each validation method is memoized by (raw string, extra arguments).
 
+import re
+from functools import wraps
 from core.constants import COLORS as C, PATHS as P
 from core.joystick import joykey
 from pyglet.window import key as winkey
-import re
+
+HEX_COLOR = re.compile(r'^#(?:[0-9a-fA-F]{3}){1,2}$')
+KEYBOARD_KEYS = set(winkey._key_names.values())
+LITERALS = {'True': True, 'False': False, 'None': None}
+
+
+def parse_number(x):
+    '''Parse an integer or a float literal (raise a ValueError otherwise)'''
+    try:
+        return int(x)
+    except ValueError:
+        return float(x)
+
+
+def parse_literal(x):
+    '''Parse a number or a boolean literal (raise a ValueError otherwise)'''
+    if x in LITERALS:
+        return LITERALS[x]
+    return parse_number(x)
+
+
+def parse_sequence(x):
+    '''Parse a tuple or a list of numbers, like (255,0,0,255) (raise a ValueError otherwise)'''
+    brackets = {'(': tuple, '[': list}
+    if len(x) < 2 or x[0] not in brackets or x[-1] != {'(': ')', '[': ']'}[x[0]]:
+        raise ValueError(x)
+    return brackets[x[0]](parse_number(v) for v in x[1:-1].split(',') if v.strip() != '')
+
+
+def memoized(method):
+    results = dict()
+
+    @wraps(method)
+    def memoized_method(x, *args):
+        if not isinstance(x, str):
+            return method(x, *args)
+
+        key = (x, *[tuple(a) if isinstance(a, list) else a for a in args])
+        if key not in results:
+            results[key] = method(x, *args)
+        value, error = results[key]
+        # A list value is copied, so that the event that receives it can not alter the others
+        return (list(value) if isinstance(value, list) else value), error
+    return memoized_method
+
+
+def validate_value(method, x):
+    '''Check and type a raw (string) value with a validation method, or with a (method, *args)
+       tuple. Return the typed value and an error message (None if the value is accepted).'''
+    method, *method_args = method if isinstance(method, tuple) else (method,)
+
+    # Remove potential blank spaces in the argument
+    # (except is the method is waiting for a string, like title)
+    if method.__name__ != 'is_string':
+        x = x.replace(' ', '')
+
+    return method(x, *method_args)
+
 
 def is_string(x):
     # Should always be True as we are reading parameters from a text file
@@ -20,12 +81,12 @@ def is_string(x):
         return None, _('should be a string (not %s).') % x
 
 
+@memoized
 def is_natural_integer(x):
     msg = _('should be a natural (0 included) integer (not %s).') % x
     try:
-        x = eval(x)
-        x = int(x)
-    except:
+        x = int(parse_literal(x))
+    except (ValueError, TypeError, OverflowError):
         return None, msg
     else:
         if x >= 0:
@@ -34,50 +95,53 @@ def is_natural_integer(x):
             return None, msg
 
 
+@memoized
 def is_positive_integer(x):
-    if is_natural_integer(x)[0] is not None and int(eval(x)) > 0:
-        return eval(x), None
+    value, error = is_natural_integer(x)
+    if error is None and value > 0:
+        return parse_literal(x), None
     else:
         return None, _('should be a positive (0 excluded) integer (not %s).') % x
 
 
+@memoized
 def is_boolean(x):
     if x.capitalize() in ['True', 'False']:
-        return eval(x.capitalize()), None
+        return x.capitalize() == 'True', None
     elif x in ['1', '0']:
         return bool(int(x)), None
     else:
         return None, _('should be a boolean (not %s).') % x
 
 
+@memoized
 def is_color(x):  # Can be an hexadecimal value, a constant name, or an RGBa value
-    m = re.search(r'^#(?:[0-9a-fA-F]{3}){1,2}$', x)
-    if m is not None:
+    if HEX_COLOR.match(x) is not None:
         x = x.lstrip('#')
         rgba = tuple(list(int(x[i:i + 2], 16) for i in (0, 2, 4)) + [255])
         return rgba, None
-    elif x in list(C.keys()):
+    elif x in C:
         return C[x], None
     else:
         try:
-            x = eval(x)
-        except:
+            x = parse_sequence(x)
+        except ValueError:
             return None, _('must be (R,G,B,a) or hexadecimal (e.g., #00ff00) values (not %s)') % x
         else:
-            if ((isinstance(x, tuple) or isinstance(x, list))
-                    and len(x) == 4 and all([0 <= v <= 255 for v in x])):
+            if len(x) == 4 and all([0 <= v <= 255 for v in x]):
                 return tuple(x), None
             else:
                 x = str(x)
                 return None, _('should be (R,G,B,a) values each comprised between 0 and 255 (not %s)') % x
 
 
+@memoized
 def is_positive_float(x):
     # Remove a potential floating point and test the other char
     msg = _('should be a positive float (not %s)') % x
     is_float = x.replace('.','',1).isdigit() and '.' in x
     if is_float:
-        x = eval(x)
+        x = float(x)
         if x > 0:
             return x, None
         else:
@@ -86,6 +150,7 @@ def is_positive_float(x):
         return None, msg
 
 
+@memoized
 def is_in_list(x, li):
     # Turn x into a list
     x = [str(el) for el in x.split(',')] if ',' in x else [x]
@@ -97,21 +162,19 @@ def is_in_list(x, li):
     errors = [el for el in x if el not in li] if result == False else list()
 
     if result == True:  # If all elements of x are in target (li) list
-    # Try to get an evaluated version of the (x) input
+    # Try to get a typed version of the (x) input (numbers, booleans)
         try:
-            x = [eval(el) for el in x]
-        except NameError:
-            if len(x) == 1:
-                x = x[0]
-            return x, None
-        else:
-            if len(x) == 1:
-                x = x[0]
-            return x, None
+            x = [parse_literal(el) for el in x]
+        except ValueError:
+            pass
+        if len(x) == 1:
+            x = x[0]
+        return x, None
     else:
         return None, _('should be comprised in %s (not %s)') % (li, *errors,)
 
 
+@memoized
 def is_a_regex(x):
     try:
         re.compile(x)
@@ -121,14 +184,15 @@ def is_a_regex(x):
         return x, None
 
 
+@memoized
 def is_keyboard_key(x):
-    keys_list = list(winkey._key_names.values())
-    if x in keys_list:
+    if x in KEYBOARD_KEYS:
         return x, None
     else:
         return None, _('should be an acceptable keyboard key value (not %s). See documentation.') % x
 
 
+@memoized
 def is_joystick_key(x):
     if joykey is not None: # Means that the joystick is plugged
         if x in joykey.keys():
@@ -138,14 +202,15 @@ def is_joystick_key(x):
     return None, None
 
 
+@memoized
 def is_key(x):
     kk, kmsg = is_keyboard_key(x)
     if kmsg is None:
-        return is_keyboard_key(x)
+        return kk, kmsg
 
     jk, jmsg = is_joystick_key(x)
     if jmsg is None:
-        return is_joystick_key(x)
+        return jk, jmsg
 
     return None, _('should be an acceptable (keyboard or joystick) key value (not %s). See documentation.') % x
 
@@ -157,6 +222,7 @@ def is_task_location(x):
 
 # In callsign, only letters and digits are allowed
 allowed_char_list = list('abcdefghijklmnopqrstuvwxyz0123456789')
+@memoized
 def is_callsign(x):
     if all([el.lower() in allowed_char_list for el in x]):
         return x, None
@@ -166,6 +232,7 @@ def is_callsign(x):
         return None, _('should be composed of letters [a-z] or digits [0-9] (not %s in %s)') % (*errors, x)
 
 
+@memoized
 def is_callsign_or_list_of(x):
     # Turn x into a list
     x = [str(el) for el in x.split(',')] if ',' in x else [x]
@@ -181,12 +248,12 @@ def is_callsign_or_list_of(x):
         return None, _('should be composed of valid callsigns (not %s)') % err_cs
 
 
+@memoized
 def is_in_unit_interval(x):
     msg = _('should be a float between 0 and 1 (included) (not %s)') % x
     try:
-        x = eval(x)
-        x = float(x)
-    except NameError:
+        x = float(parse_literal(x))
+    except (ValueError, TypeError):
         return None, msg
     else:
         if 0 <= x <= 1:
@@ -198,6 +265,7 @@ def is_in_unit_interval(x):
 def is_available_text_file(x):
     # The filename of a blocking plugin is to be found either
     # in the scenario or the questionnaire folder
+    # (not memoized: the files can change)
     if any([p.joinpath(x).exists() for p in [P['QUESTIONNAIRES'], P['INSTRUCTIONS']]]):
         return x, None
     else:
@@ -52,6 +52,7 @@ class Frame(AbstractWidget):
 
         if self.is_visible():
             self.on_batch['border'].vertices = self.get_border_vertices()
+            self.invalidate()
 
 
     def get_border_thickness(self):
@@ -62,6 +63,7 @@ class Frame(AbstractWidget):
         if color == self.get_border_color():
             return
         self.on_batch['border'].colors[:] = color * 16
+        self.invalidate()
         self.logger.record_state(self.name, 'color', color)
 
 
@@ -82,5 +84,6 @@ class Frame(AbstractWidget):
             v = self.vertice_border(self.container) if self.is_visible() else (0,)*8
             self.on_batch['fillarea'].vertices = v
 
+        self.invalidate()
         self.logger.record_state(self.name, 'visibility', visible)
 
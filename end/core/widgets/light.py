@@ -28,6 +28,7 @@ class Light(AbstractWidget):
         if label_to_upper == self.get_label():
             return
         self.vertex['label'].text = label_to_upper
+        self.invalidate()
         self.logger.record_state(self.name, 'label', label_to_upper)
 
 
@@ -40,6 +41,7 @@ class Light(AbstractWidget):
             return
         self.on_batch['background'].colors[:] = color*4
         self.on_batch['border'].colors[:] = self.border_color*8
+        self.invalidate()
 
         self.logger.record_state(self.name, 'background', color)
         self.logger.record_state(self.name, 'border', self.border_color)
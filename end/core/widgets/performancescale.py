@@ -72,6 +72,7 @@ class Performancescale(AbstractWidget):
         v1 = list(self.vertice_border(self.container))
         v1[1] = v1[3] = self.get_y_of(self.performance_level)
         self.on_batch['performance'].vertices = v1
+        self.invalidate()
         self.logger.record_state(self.name, 'level', self.performance_level)
 
 
@@ -84,6 +85,7 @@ class Performancescale(AbstractWidget):
             return
         self.performance_color = color
         self.on_batch['performance'].colors[:] = color * 4
+        self.invalidate()
         self.logger.record_state(self.name, 'color', self.performance_color)
 
 
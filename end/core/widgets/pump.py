@@ -59,6 +59,7 @@ class Pump(AbstractWidget):
         if color == self.get_color():
             return
         self.on_batch['triangle'].colors[:] = color * 3
+        self.invalidate()
         self.logger.record_state(self.name, 'triangle', color)
 
     def get_color(self):
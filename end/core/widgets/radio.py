@@ -57,6 +57,7 @@ class Radio(AbstractWidget):
         for name, info in self.arrows.items():
             v = (0, 0)*3  # Get an invisible vertice (hide)
             self.on_batch[name].vertices = v
+        self.invalidate()
         self.is_selected = False
         self.logger.record_state(self.name, 'selected', False)
 
@@ -65,6 +66,7 @@ class Radio(AbstractWidget):
         for name, info in self.arrows.items():
             v = self.get_triangle_vertice(x_ratio=info['x_ratio'], angle=info['angle'])
             self.on_batch[name].vertices = v
+        self.invalidate()
         self.is_selected = True
         self.logger.record_state(self.name, 'selected', True)
 
@@ -77,6 +79,7 @@ class Radio(AbstractWidget):
         if not self.is_new_frequency(frequency):
             return
         self.vertex['radio_frequency'].text = self.get_frequency_string(frequency)
+        self.invalidate()
         self.logger.record_state(self.name, 'radio_frequency', frequency)
 
 
@@ -84,4 +87,5 @@ class Radio(AbstractWidget):
         if color == self.get_vertex_color('feedback_lines'):
             return
         self.on_batch['feedback_lines'].colors[:] = color * 8
+        self.invalidate()
         self.logger.record_state(self.name, 'feedback_color', color)
@@ -55,9 +55,10 @@ class Reticle(AbstractWidget):
                         ('c4B/static', (C['BLACK']*(len(v)//2))))
 
         # Cursor definition
-        v = self.get_cursor_vertice()
-        self.add_vertex('cursor', len(v)//2, GL_LINES, G(self.m_draw+2), ("v2f/stream", v),
-                        ('c4B/dynamic', (cursorcolor*(len(v)//2))))
+        v = geometry.to_list(self.get_cursor_vertice())
+        self.cursor_vertices_n = len(v)//2
+        self.add_vertex('cursor', self.cursor_vertices_n, GL_LINES, G(self.m_draw+2),
+                        ("v2f/stream", v), ('c4B/dynamic', (cursorcolor*self.cursor_vertices_n)))
 
 
     def set_target_proportion(self, proportion):
@@ -67,6 +68,7 @@ class Reticle(AbstractWidget):
         self.target_radius = self.container.w/2 * proportion
         v = self.vertice_circle([self.container.cx, self.container.cy], self.target_radius, 50)
         self.on_batch['target_area'].vertices = self.on_batch['target_border'].vertices = v
+        self.invalidate()
         self.logger.record_state(self.name, 'target_proportion', proportion)
 
 
@@ -75,13 +77,8 @@ class Reticle(AbstractWidget):
 
 
     def get_cursor_vertice(self):
-        v = self.vertice_strip(self.vertice_circle(self.cursor_absolute,
-                                                   self.cursor_radius, 20))
-        v.extend([self.cursor_absolute[0] - self.cursor_radius, self.cursor_absolute[1],
-                  self.cursor_absolute[0] + self.cursor_radius, self.cursor_absolute[1]])
-        v.extend([self.cursor_absolute[0], self.cursor_absolute[1] - self.cursor_radius,
-                  self.cursor_absolute[0], self.cursor_absolute[1] + self.cursor_radius])
-        return v
+        # A 20 points circle (as segments), crossed by its horizontal and vertical diameters
+        return geometry.place('crossed_circle_strip', 20, self.cursor_absolute, self.cursor_radius)
 
 
     def is_cursor_in_target(self):
@@ -105,8 +102,8 @@ class Reticle(AbstractWidget):
         if self.get_cursor_absolute_position() == self.relative_to_absolute():
             return
         self.cursor_absolute = self.relative_to_absolute()
-        v = self.get_cursor_vertice()
-        self.on_batch['cursor'].vertices = v
+        geometry.write_vertices(self.on_batch['cursor'], self.get_cursor_vertice())
+        self.invalidate()
         self.logger.record_state(self.name, 'cursor_relative', (x, y))
         self.logger.record_state(self.name, 'cursor_proportional', self.relative_to_proportional())
 
@@ -133,8 +130,8 @@ class Reticle(AbstractWidget):
     def set_cursor_color(self, color):
         if color == self.get_cursor_color():
             return
-        length = len(self.get_cursor_vertice())//2
-        self.on_batch['cursor'].colors[:] = color * length
+        self.on_batch['cursor'].colors[:] = color * self.cursor_vertices_n
+        self.invalidate()
         self.logger.record_state(self.name, 'cursor_color', color)
 
 
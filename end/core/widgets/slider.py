@@ -4,10 +4,10 @@
 
 from pyglet.gl import *
 from core.container import Container
-from core.constants import COLORS as C, Group as G, FONT_SIZES as F, REPLAY_MODE
+from core.constants import COLORS as C, Group as G, FONT_SIZES as F, REPLAY_MODE, HEADLESS_MODE
 from core.widgets import AbstractWidget
 from core.widgets import AbstractWidget
-from pyglet.text import Label
+from core.widgets.abstractwidget import Label
 from core.window import Window
 import math
 
@@ -26,14 +26,16 @@ class Slider(AbstractWidget):
 
         self.rank = rank
         self.groove_value = self.value_default
+        self.groove_vertices = None
         self.hover = False
 
         # Enhance smoothing mode
-        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
-        glEnable(GL_BLEND)
-        glEnable(GL_LINE_SMOOTH)
-        glHint(GL_LINE_SMOOTH_HINT, GL_DONT_CARE)
-        glLineWidth(3)
+        if not HEADLESS_MODE:
+            glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+            glEnable(GL_BLEND)
+            glEnable(GL_LINE_SMOOTH)
+            glHint(GL_LINE_SMOOTH_HINT, GL_DONT_CARE)
+            glLineWidth(3)
 
 
         self.set_sub_containers()
@@ -102,17 +104,22 @@ class Slider(AbstractWidget):
 
 
     def set_groove_position(self):
-        if self.get_groove_vertices() == self.on_batch['groove'].vertices:
+        # Compare with the last vertices set (the batch returns them as a float32 array)
+        groove_vertices = self.get_groove_vertices()
+        if groove_vertices == self.groove_vertices:
             return
 
-        self.on_batch['groove'].vertices = self.get_groove_vertices()
-        self.on_batch['groove_b'].vertices = self.get_groove_vertices()
+        self.groove_vertices = groove_vertices
+        self.on_batch['groove'].vertices = groove_vertices
+        self.on_batch['groove_b'].vertices = groove_vertices
+        self.invalidate()
 
 
     def set_value_label(self):
         if str(self.groove_value) == self.vertex['value'].text:
             return
         self.vertex['value'].text = str(self.groove_value)
+        self.invalidate()
 
 
     #TODO: hide cursor when finished
@@ -73,6 +73,7 @@ class Tank(AbstractWidget):
             return
         self.tolerance_radius = radius
         self.on_batch['tolerance'].vertices = self.get_tolerance_vertices(radius, target, level_max)
+        self.invalidate()
         self.logger.record_state(self.name, 'tolerance_radius', radius)
         self.logger.record_state(self.name, 'target', target)
         self.logger.record_state(self.name, 'level_max', level_max)
@@ -82,6 +83,7 @@ class Tank(AbstractWidget):
         if color == self.get_tolerance_color():
             return
         self.on_batch['tolerance'].colors[:] = color * 4
+        self.invalidate()
         self.logger.record_state(self.name, 'tolerance_color', color)
 
 
@@ -100,6 +102,7 @@ class Tank(AbstractWidget):
         v1 = list(self.vertice_border(self.container))
         v1[1] = v1[3] = self.get_y_of(level, level_max)
         self.on_batch['fluid'].vertices = v1
+        self.invalidate()
         self.logger.record_state(self.name, 'fluid_level', level)
 
 
@@ -111,6 +114,7 @@ class Tank(AbstractWidget):
         if label == self.get_fluid_label():
             return
         self.vertex['fluid_label'].text = label
+        self.invalidate()
         self.logger.record_state(self.name, 'fluid_label', label)
 
 
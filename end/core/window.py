@@ -3,7 +3,9 @@
 # License : CeCILL, version 2.1 (see the LICENSE file)
 
 import sys
-from pyglet import font, image
+from time import perf_counter
+from pyglet import app, font, image
+from pyglet.app import EventLoop
 from pyglet.canvas import get_display
 from pyglet.window import Window, key as winkey
 from pyglet.graphics import Batch
@@ -13,9 +15,10 @@ from pyglet import image, sprite
 from core.container import Container
 from core.constants import COLORS as C, FONT_SIZES as F, Group as G, PLUGIN_TITLE_HEIGHT_PROPORTION
 from core.constants import PATHS as P
-from core.constants import REPLAY_MODE, REPLAY_STRIP_PROPORTION
+from core.constants import REPLAY_MODE, REPLAY_STRIP_PROPORTION, FORCED_REDRAW_INTERVAL
 from core.modaldialog import ModalDialog
 from core.logger import logger
+from core.profiler import profiler
 import core.error
 from core.utils import get_conf_value
 
@@ -27,6 +30,8 @@ class Window(Window):
     def __init__(self, *args, **kwargs):
 
         Window.MainWindow = self # correct way to set it as a static
+        self.containers = None   # Placements containers by name (see get_containers)
+        self.profiler_label = None
 
         screen = self.get_screen()
 
@@ -117,6 +122,21 @@ class Window(Window):
         self.set_mouse_visible(self.is_mouse_necessary())
         self.clear()
         self.batch.draw()
+        if profiler.overlay:
+            self.draw_profiler_overlay()
+
+        # Not redrawn until a widget changes (but the replay is always redrawn)
+        self.invalid = REPLAY_MODE
+
+
+    def on_expose(self):
+        self.invalid = True
+
+
+    def on_resize(self, width, height):
+        super().on_resize(width, height)
+        self.containers = None  # Placements depend on the window size
+        self.invalid = True
 
 
     def is_mouse_necessary(self):
@@ -137,6 +157,9 @@ class Window(Window):
                 self.exit_prompt()
             elif keystr == 'P':
                 self.pause_prompt()
+            elif keystr == 'F12' and profiler.enabled:
+                profiler.toggle_overlay()
+                self.invalid = True
 
             logger.record_input('keyboard', keystr, 'press')
 
@@ -154,6 +177,17 @@ class Window(Window):
         logger.record_input('keyboard', keystr, 'release')
 
 
+    def draw_profiler_overlay(self):
+        text = profiler.get_overlay_text()
+        if self.profiler_label is None:
+            self.profiler_label = Label(text, font_name='monospace', font_size=F['SMALL'],
+                                        x=10, y=self.height - 10, anchor_y='top',
+                                        multiline=True, width=self.width, color=C['WHITE'])
+        elif self.profiler_label.text != text:
+            self.profiler_label.text = text
+        self.profiler_label.draw()
+
+
     def exit_prompt(self):
         self.modal_dialog = ModalDialog(self, _('You hit the Escape key'), 
                                         title=_('Exit OpenMATB?'), exit_key='q')
@@ -191,10 +225,18 @@ class Window(Window):
                 Container('inputstrip', w, b, self._width*mar, h)]
 
 
+    def get_containers(self):
+        '''Return the placements containers by name. They are computed once (per window size),
+           so they can be queried at any time without parsing the configuration again'''
+        if self.containers is None:
+            self.containers = {c.name: c for c in self.get_container_list()}
+        return self.containers
+
+
     def get_container(self, placement_name):
-        container = [c for c in self.get_container_list() if c.name == placement_name]
-        if len(container) > 0:
-            return container[0]
+        containers = self.get_containers()
+        if placement_name in containers:
+            return containers[placement_name]
         else:
             print(_('Error. No placement found for the [%s] alias') % placement_name)
 
@@ -204,3 +246,34 @@ class Window(Window):
         # for example to close
         self.modal_dialog = ModalDialog(self, pass_list, title=title,
                                                       continue_key=continue_key, exit_key='Q')
+
+
+class EventLoop(EventLoop):
+    """
+    The pyglet event loop redraws the windows each time a scheduled function has been called,
+    so at every frame here. Only redraw the windows that have been invalidated (see
+    AbstractWidget.invalidate), and at least every FORCED_REDRAW_INTERVAL seconds.
+    """
+    frame_duration = 1 / 60
+    last_redraw_time = 0
+
+
+    def idle(self):
+        dt = self.clock.update_time()
+        self.clock.call_scheduled_functions(dt)
+
+        must_redraw = perf_counter() - self.last_redraw_time > FORCED_REDRAW_INTERVAL
+        redrawn = False
+        for window in app.windows:
+            if window.invalid or must_redraw or profiler.is_overlay_outdated():
+                window.switch_to()
+                profiler.measure(('window', 'draw'), window.dispatch_event, 'on_draw')
+                window.flip()
+                redrawn = True
+
+        if redrawn:
+            self.last_redraw_time = perf_counter()
+            return self.clock.get_sleep_time(True)
+
+        # No flip to wait for the vertical synchronization: keep the frame rate by waiting
+        return self.frame_duration
@@ -0,0 +1,95 @@
+#! .venv/bin/python3
+
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+# Check scenario files without running them: no window is opened and no session is logged
+# Each scenario is checked as when it is launched (see Scenario, in check_only mode): its lines
+# are parsed, its plugins loaded (headless) and its events checked against their methods and
+# validation methods. The files are distributed over a pool of processes.
+#
+# Usage: lint.py PATH [PATH ...] [--workers N]
+# - paths are scenario files or folders (whose .txt files are all checked), given relatively to
+#   the current folder or to the includes/scenarios folder
+# - the exit code is 1 if any scenario has an error
+
+import gettext, os, sys
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# pyglet must not create its hidden shadow window (it needs a display), neither in this process
+# nor in the workers (which import this module first)
+import pyglet
+pyglet.options['shadow_window'] = False
+
+# The core package is only imported by the workers
+SCENARIOS_PATH = Path('.', 'includes', 'scenarios')
+
+LOCALE_PATH = Path('.', 'locales')
+language_iso = [l for l in open('config.ini', 'r').readlines()
+                if 'language=' in l][0].split('=')[-1].strip()
+language = gettext.translation('openmatb', LOCALE_PATH, [language_iso])
+language.install()
+
+
+def init_worker():
+    # Core modules read the command line when imported. In replay mode, the logger opens no
+    # session file (the stop commands are still checked, see check_only)
+    sys.argv = ['main.py', '-r', '0', '--headless']
+
+    from core.headless import HeadlessWindow
+    HeadlessWindow()
+
+
+def lint_scenario(path):
+    from core.scenario import Scenario
+    try:
+        contents = open(path, 'r').readlines()
+        errors = Scenario(contents, check_only=True).check_errors
+    except Exception as e:  # Report any unexpected failure as an error of the scenario
+        errors = [repr(e)]
+    return errors
+
+
+def get_scenario_paths(paths):
+    scenario_paths = list()
+    for path in paths:
+        if not path.exists() and SCENARIOS_PATH.joinpath(path).exists():
+            path = SCENARIOS_PATH.joinpath(path)
+
+        if path.is_dir():
+            scenario_paths += sorted(path.rglob('*.txt'))
+        else:
+            scenario_paths.append(path)
+    return scenario_paths
+
+
+def main():
+    parser = ArgumentParser(description=_('Check OpenMATB scenario files'))
+    parser.add_argument('paths', nargs='+', type=Path)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    scenario_paths = get_scenario_paths(args.paths)
+    failed_n = 0
+    workers = args.workers or os.cpu_count()
+    chunksize = max(1, len(scenario_paths) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        for path, errors in zip(scenario_paths, executor.map(lint_scenario, scenario_paths,
+                                                             chunksize=chunksize)):
+            if len(errors) == 0:
+                print(f'OK     {path}')
+            else:
+                failed_n += 1
+                print(f'ERROR  {path}')
+                for error in errors:
+                    print(f'       {error}')
+
+    print(_('%s scenario(s) checked, %s with errors') % (len(scenario_paths), failed_n))
+    sys.exit(1 if failed_n > 0 else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,8 @@ from core.widgets import Simpletext, SimpleHTML, Frame
 from core.constants import *
 from core.container import Container
 from core.logger import logger
+from core.profiler import profiler
+from core.rollingmetric import RollingMetric
 from core.window import Window
 
 class AbstractPlugin:
@@ -19,6 +21,7 @@ class AbstractPlugin:
         self.widgets = dict()                           #   To store the widget objects of a plugin
         self.container = None                           #   The visual area of the plugin (object)
         self.logger = logger
+        self.scheduler = None                           #   Notified of any plugin state change
 
         self.can_receive_keys = False
         self.can_execute_keys = False
@@ -54,10 +57,15 @@ class AbstractPlugin:
     def on_scenario_loaded(self, scenario):
         pass
 
+    def can_capture_keyframe(self):
+        '''Return False while the plugin state depends on something a replay keyframe can not
+           save (e.g., an audio prompt being played)'''
+        return True
+
     def update(self, scenario_time):
         self.scenario_time = scenario_time
-        self.compute_next_plugin_state()
-        self.refresh_widgets()
+        profiler.measure((self.alias, 'compute_next_plugin_state'), self.compute_next_plugin_state)
+        profiler.measure((self.alias, 'refresh_widgets'), self.refresh_widgets)
         self.update_can_receive_key()
 
 
@@ -131,6 +139,7 @@ class AbstractPlugin:
             print('Pause ', self.alias)
         self.paused = True
         self.update_can_receive_key()
+        self.notify_state_change()
 
 
     def resume(self):
@@ -138,6 +147,7 @@ class AbstractPlugin:
             print('Resume ', self.alias)
         self.paused = False
         self.update_can_receive_key()
+        self.notify_state_change()
 
 
     def start(self):
@@ -145,6 +155,7 @@ class AbstractPlugin:
             print('Start ', self.alias)
             print('with keys ', self.keys)
         self.alive = True
+        self.notify_state_change()
         self.create_widgets()
         self.log_all_parameters(self.parameters)
         self.show()
@@ -155,10 +166,17 @@ class AbstractPlugin:
         if self.verbose:
             print('Stop ', self.alias)
         self.alive = False
+        self.notify_state_change()
         self.pause()
         self.hide()
 
 
+    def notify_state_change(self):
+        '''Let the scheduler update its cached lists of plugins by state'''
+        if self.scheduler is not None:
+            self.scheduler.on_plugin_state_change(self)
+
+
     def is_a_widget_name(self, name):
         return self.get_widget_fullname(name) in self.widgets
 
@@ -404,7 +422,7 @@ class AbstractPlugin:
         if not hasattr(self, 'performance'):
             self.performance = dict()
         if name not in self.performance.keys():
-            self.performance[name] = list()
+            self.performance[name] = RollingMetric()
         self.performance[name].append(value)
         self.logger.log_performance(self.alias, name, value)
 
@@ -477,12 +495,16 @@ class BlockingPlugin(AbstractPlugin):
                 self.current_slide = self.slides[0]; del self.slides[0]
                 self.make_slide_graphs()
                 self.show()
+
+                # Nobody can answer in headless mode: the slide is validated at the next update
+                self.go_to_next_slide = HEADLESS_MODE
             else:
                 if self.stop_on_end:
                     self.stop()
                 else:
                     self.hide()
                     self.blocking = False
+                    self.notify_state_change()
 
 
     def make_slide_graphs(self):
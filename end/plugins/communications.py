@@ -5,7 +5,8 @@
 from string import ascii_uppercase, digits, ascii_lowercase
 from math import copysign
 from pathlib import Path
-from pyglet.media import Player, SourceGroup, load
+from concurrent.futures import ThreadPoolExecutor
+from pyglet.media import Player, StaticSource, load
 from plugins.abstractplugin import AbstractPlugin
 from core.widgets import Radio, Simpletext
 from core.container import Container
@@ -14,6 +15,24 @@ from core.pseudorandom import randint, uniform, choice, xeger
 from core import validation
 
 
+# Decoded samples of each voice (sounds folder), as futures of {sample name: StaticSource}
+# A voice is decoded once, by a worker thread, as soon as it is selected
+voices_samples = dict()
+samples_loader = ThreadPoolExecutor(max_workers=1)
+
+
+def load_voice_samples(sound_path):
+    return {path.stem: load(str(path), streaming=False) for path in sorted(sound_path.glob('*.wav'))}
+
+
+class PromptSource(StaticSource):
+    '''A whole radio prompt, premixed from decoded samples into a single PCM buffer'''
+    def __init__(self, samples):
+        self.audio_format = samples[0].audio_format
+        self._data = b''.join([sample._data for sample in samples])
+        self._duration = len(self._data) / self.audio_format.bytes_per_second
+
+
 class Communications(AbstractPlugin):
     def __init__(self, label='', taskplacement='bottomleft', taskupdatetime=80):
         super().__init__(_('Communications'), taskplacement, taskupdatetime)
@@ -100,6 +119,9 @@ class Communications(AbstractPlugin):
             if not sample_needed.exists():
                 print(sample_needed, _(' does not exist'))
 
+        if self.sound_path not in voices_samples:
+            voices_samples[self.sound_path] = samples_loader.submit(load_voice_samples, self.sound_path)
+
 
     def regenerate_callsigns(self):
         self.parameters['owncallsign'] = self.get_callsign()
@@ -155,12 +177,9 @@ class Communications(AbstractPlugin):
                           + [radio_name.lower()] + ['frequency'] + [c.lower().replace('.', 'point')
                                                                     for c in str(freq)] + ['empty']
 
-        group = SourceGroup()
-        for f in list_of_sounds:
-            source = load(str(self.sound_path.joinpath(f'{f}.wav')), streaming=False)
-            # print(f)
-            group.add(source)
-        return group
+        # Waits for the voice samples only if they are still being decoded
+        samples = voices_samples[self.sound_path].result()
+        return PromptSource([samples[f] for f in list_of_sounds])
 
 
     def prompt_for_a_new_target(self, destination, radio_name):
@@ -189,6 +208,11 @@ class Communications(AbstractPlugin):
         self.player.play()
 
 
+    def can_capture_keyframe(self):
+        # Audio players are not part of replay keyframes: wait for the pending prompt to end
+        return self.get_radios_by_key_value('is_prompting', True) is None
+
+
     def get_rand_frequency(self, radio_n):
         return round(uniform(float(self.parameters['airbandminMhz']),
                              float(self.parameters['airbandmaxMhz']),
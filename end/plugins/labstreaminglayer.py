@@ -2,6 +2,9 @@
 # Institut National Universitaire Champollion (Albi, France).
 # License : CeCILL, version 2.1 (see the LICENSE file)
 
+from queue import SimpleQueue, Empty
+from threading import Thread, Event
+from time import perf_counter
 from plugins import Instructions
 from core import validation
 
@@ -10,22 +13,46 @@ try:
 except:
     print("unable to import pylsl")
 
+
+PUSH_INTERVAL = 0.05  # Seconds between two chunks pushed by the outlet thread
+
+# Continuous states streamed by the numeric outlet (streamstates): (module, address) of the
+# logged state, and the names of its channels (one per component of its value)
+NUMERIC_STATES = [('track', 'reticle, cursor_relative', ['cursor_x', 'cursor_y'])] + \
+                 [('resman', f'tank_{t}, fluid_level', [f'tank_{t}_level']) for t in 'abcdef']
+
+
 class Labstreaminglayer(Instructions):
     def __init__(self):
         super().__init__()
 
         self.validation_dict =  {
             'marker': validation.is_string,
-            'streamsession': validation.is_boolean,
+            'streamsession': validation.is_boolean, 'streamstates': validation.is_boolean,
             'pauseatstart': validation.is_boolean, 'state': validation.is_string}
 
-        self.parameters.update({'marker':'', 'streamsession':False,
+        self.parameters.update({'marker':'', 'streamsession':False, 'streamstates':False,
                                 'pauseatstart':False})
 
         self.stream_info = None
         self.stream_outlet = None
+        self.states_outlet = None
         self.stop_on_end = False
 
+        # Markers and states are buffered, and pushed by chunks from a background thread
+        self.push_queue = SimpleQueue()
+        self.outlet_thread = None
+        self.stop_pushing = Event()
+        self.clock_offset = 0  # From the log time (perf_counter) to the LSL clock
+
+        # Numeric channels: the first channel of each streamed state, and the last values
+        self.states_channels = dict()
+        channels_n = 0
+        for module, address, channels in NUMERIC_STATES:
+            self.states_channels[(module, address)] = channels_n
+            channels_n += len(channels)
+        self.states_sample = [float('nan')] * channels_n
+
         self.lsl_wait_msg = _("Please enable the OpenMATB stream into your LabRecorder.")
 
 
@@ -38,11 +65,25 @@ class Labstreaminglayer(Instructions):
                                              nominal_srate=0, channel_format='string',
                                              source_id='myuidw435368')
         self.stream_outlet = pylsl.StreamOutlet(self.stream_info)
+        self.clock_offset = pylsl.local_clock() - perf_counter()
+        self.start_outlet_thread()
 
         if self.parameters['pauseatstart'] is True:
             self.slides = [self.get_msg_slide_content(self.lsl_wait_msg)]
 
 
+    def create_states_outlet(self):
+        # An irregular numeric stream, with a labelled channel per state component
+        info = pylsl.StreamInfo('OpenMATB-states', type='MATB', nominal_srate=0,
+                                channel_count=len(self.states_sample), channel_format='float32',
+                                source_id='myuidw435368-states')
+        channels = info.desc().append_child('channels')
+        for *_, names in NUMERIC_STATES:
+            for name in names:
+                channels.append_child('channel').append_child_value('label', name)
+        self.states_outlet = pylsl.StreamOutlet(info)
+
+
     def update(self, dt):
         super().update(dt)
 
@@ -51,6 +92,10 @@ class Labstreaminglayer(Instructions):
         elif self.parameters['streamsession'] is False and self.logger.lsl is not None:
             self.logger.lsl = None
 
+        if self.parameters['streamstates'] is True and self.states_outlet is None \
+                and self.stream_outlet is not None:
+            self.create_states_outlet()
+
         if self.parameters['marker'] != '':
             # A marker has been set. Push it to the outlet.
             self.push(self.parameters['marker'])
@@ -59,20 +104,72 @@ class Labstreaminglayer(Instructions):
             self.parameters['marker'] = ''
 
 
-    def push(self, message):
+    def push(self, message, logtime=None):
+        '''Buffer a marker. Its timestamp is the log time of its row, if any'''
         if self.stream_outlet is None:
             return
-        self.stream_outlet.push_sample([message])
-#        print(message)
+        timestamp = perf_counter() if logtime is None else logtime
+        self.push_queue.put(('marker', message, timestamp + self.clock_offset))
 
 
+    def push_state(self, module, address, value, logtime):
+        '''Buffer a numeric state, if it is streamed'''
+        if self.states_outlet is None or (module, address) not in self.states_channels:
+            return
+        value = list(value) if isinstance(value, (list, tuple)) else [value]
+        self.push_queue.put(('state', (self.states_channels[(module, address)], value),
+                             logtime + self.clock_offset))
+
+
+    def start_outlet_thread(self):
+        self.stop_pushing.clear()
+        self.outlet_thread = Thread(target=self.push_chunks, name='lsl', daemon=True)
+        self.outlet_thread.start()
+
+
+    def stop_outlet_thread(self):
+        if self.outlet_thread is None:
+            return
+        self.stop_pushing.set()
+        self.outlet_thread.join()
+        self.outlet_thread = None
+
+
+    def push_chunks(self):
+        # Background thread: periodically push all the buffered markers and states at once
+        while not self.stop_pushing.wait(PUSH_INTERVAL):
+            self.push_queued_samples()
+        self.push_queued_samples()  # Drain the queue before leaving
+
+
+    def push_queued_samples(self):
+        # Each sample keeps its own timestamp (push_chunk only accepts a single timestamp)
+        while True:
+            try:
+                outlet, sample, timestamp = self.push_queue.get_nowait()
+            except Empty:
+                break
+
+            # A sample that can not be pushed is dropped, but must not stop the outlet thread
+            try:
+                if outlet == 'marker':
+                    self.stream_outlet.push_sample([sample], timestamp)
+                elif self.states_outlet is not None:
+                    # States are sampled and held: each change is sent with all the other values
+                    first_channel, values = sample
+                    self.states_sample[first_channel:first_channel + len(values)] = values
+                    self.states_outlet.push_sample(list(self.states_sample), timestamp)
+            except Exception as e:
+                print(_('Warning, a sample could not be pushed to LSL (%s)') % repr(e))
+
 
     def stop(self):
         super().stop()
+        self.stop_outlet_thread()
         self.stream_info = None
         self.stream_outlet = None
+        self.states_outlet = None
 
 
     def get_msg_slide_content(self, str_msg):
         return f"<title>Lab streaming layer\n{self.lsl_wait_msg}"
-
@@ -66,17 +66,16 @@ class Performance(AbstractPlugin):
                     # Only considering hits and missed for system monitoring
                     # HIT = 1   |   MISS = 0
                     # Compute average of 4 last signal detection events
-                    perf_list = [p for p in plugin.performance['signal_detection'] if p in ['HIT', 'FA', 'MISS']]
-                    if len(perf_list) >= 4:
-                        self.performance_levels[p] = sum([int(p == 'HIT') for p in perf_list]) / 4
+                    detections = plugin.performance['signal_detection'].counts
+                    if sum([detections[d] for d in ['HIT', 'FA', 'MISS']]) >= 4:
+                        self.performance_levels[p] = detections['HIT'] / 4
 
                 # Tracking
                 elif p == 'track':
                     # Time proportion spent in target for the last 5 seconds
                     frames_n = int(5000 / plugin.parameters['taskupdatetime'])
                     if len(plugin.performance['cursor_in_target']) >= frames_n:
-                        perf_list = plugin.performance['cursor_in_target'][-frames_n:]
-                        self.performance_levels[p] = sum(perf_list) / len(perf_list)
+                        self.performance_levels[p] = plugin.performance['cursor_in_target'].get_mean(frames_n)
 
 
                 # Resman
@@ -85,19 +84,16 @@ class Performance(AbstractPlugin):
                     frames_n = int(5000 / plugin.parameters['taskupdatetime'])
                     if len(plugin.performance['a_in_tolerance']) >= frames_n \
                             and len(plugin.performance['b_in_tolerance']) >= frames_n:
-                        a_perf_list = plugin.performance['a_in_tolerance'][-frames_n:]
-                        b_perf_list = plugin.performance['b_in_tolerance'][-frames_n:]
-
-                        perf = (sum(a_perf_list) / len(a_perf_list)) \
-                               + (sum(b_perf_list) / len(b_perf_list))
+                        perf = plugin.performance['a_in_tolerance'].get_mean(frames_n) \
+                               + plugin.performance['b_in_tolerance'].get_mean(frames_n)
 
                         self.performance_levels[p] = perf / 2
 
                 #       Communications
                 elif p == 'communications':
                     if len(plugin.performance['correct_radio']) >= 4:
-                        perf_radio = plugin.performance['correct_radio'][-4:]
-                        perf_freq = plugin.performance['response_deviation'][-4:]
+                        perf_radio = plugin.performance['correct_radio'].get_last(4)
+                        perf_freq = plugin.performance['response_deviation'].get_last(4)
                         all_good = [r == True and round(f, 1) == 0 for r, f in zip(perf_radio, perf_freq)]
 
                         self.performance_levels[p] = sum(all_good) / len(all_good)
@@ -0,0 +1,225 @@
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+# Typed columnar version of the session log
+# Rows are accumulated into compact arrays while logging, and written by chunks next to the CSV
+# file (so a crash only loses the last chunk), either as an Arrow IPC stream (if pyarrow is
+# available) or as a NumPy .npz archive.
+# - type, module, address and textual values are dictionary-encoded (integer codes + categories)
+# - numeric values (and numeric tuples like cursor positions or colors) are stored in
+#   float columns (value_0, ..., value_3), value_size giving the number of relevant components
+#   (0 means that the value is textual), and value_type the types of these components
+#   (float, int or bool, on 2 bits per component), so that values are read back with their type
+
+import zipfile
+from array import array
+from math import nan
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+CHUNK_ROWS = 10000  # Rows written at once
+VALUE_WIDTH = 4
+ENCODED_COLUMNS = ['type', 'module', 'address', 'value_text']
+VALUE_COLUMNS = [f'value_{i}' for i in range(VALUE_WIDTH)]
+VALUE_TYPES = [float, int, bool]  # Components types, as coded in the value_type column
+
+
+def get_columnar_suffix():
+    if pyarrow is not None:
+        return '.arrows'
+    elif numpy is not None:
+        return '.npz'
+
+
+def is_number(x):
+    return isinstance(x, (int, float))
+
+
+def get_component_type(x):
+    return VALUE_TYPES.index(bool if isinstance(x, bool) else int if isinstance(x, int) else float)
+
+
+def get_value_type(components):
+    return sum([get_component_type(v) << (2 * i) for i, v in enumerate(components)])
+
+
+def encode_value(value):
+    '''Return a (size, type, numeric components, text) quadruplet'''
+    if is_number(value):
+        components = (value,)
+    elif (isinstance(value, (tuple, list)) and 0 < len(value) <= VALUE_WIDTH
+          and all([is_number(v) for v in value])):
+        components = tuple(value)
+    else:
+        return 0, 0, tuple(), str(value)
+    return len(components), get_value_type(components), components, ''
+
+
+def decode_value(size, value_type, components, text):
+    if size == 0:
+        return text
+    components = [VALUE_TYPES[(value_type >> (2 * i)) & 3](v) for i, v in enumerate(components[:size])]
+    if size == 1:
+        return components[0]
+    return tuple(components)
+
+
+class ColumnarLog:
+    def __init__(self, path):
+        self.path = path
+        self.categories = {c: dict() for c in ENCODED_COLUMNS}
+        self.written_categories = {c: 0 for c in ENCODED_COLUMNS}  # Already in the file
+        self.chunks_n = 0
+        self.rows_n = 0
+        self.stream_writer = None
+        self.new_chunk()
+
+
+    def __len__(self):
+        return self.rows_n + len(self.value_size)
+
+
+    def new_chunk(self):
+        self.times = {'logtime': array('d'), 'scenario_time': array('d')}
+        self.codes = {c: array('i') for c in ENCODED_COLUMNS}
+        self.value_size = array('b')
+        self.value_type = array('B')
+        self.values = {c: array('d') for c in VALUE_COLUMNS}
+
+
+    def get_code(self, column, string):
+        categories = self.categories[column]
+        if string not in categories:
+            categories[string] = len(categories)
+        return categories[string]
+
+
+    def append(self, row):
+        self.times['logtime'].append(row.logtime)
+        self.times['scenario_time'].append(row.scenario_time)
+        for column in ['type', 'module', 'address']:
+            self.codes[column].append(self.get_code(column, str(getattr(row, column))))
+
+        size, value_type, components, text = encode_value(row.value)
+        self.value_size.append(size)
+        self.value_type.append(value_type)
+        self.codes['value_text'].append(self.get_code('value_text', text))
+        for i, column in enumerate(VALUE_COLUMNS):
+            self.values[column].append(components[i] if i < size else nan)
+
+        if len(self.value_size) >= CHUNK_ROWS:
+            self.flush()
+
+
+    def flush(self):
+        '''Write the current chunk, if it has any row'''
+        if len(self.value_size) == 0:
+            return
+        if pyarrow is not None:
+            self.write_arrow_chunk()
+        else:
+            self.write_npz_chunk()
+        self.chunks_n += 1
+        self.rows_n += len(self.value_size)
+        self.new_chunk()
+
+
+    def close(self):
+        self.flush()
+        if self.stream_writer is not None:
+            self.stream_writer.close()
+            self.stream_sink.close()
+            self.stream_writer = None
+
+
+    def write_arrow_chunk(self):
+        columns = dict()
+        columns.update({c: pyarrow.array(v, pyarrow.float64()) for c, v in self.times.items()})
+        for column in ENCODED_COLUMNS:
+            columns[column] = pyarrow.DictionaryArray.from_arrays(
+                pyarrow.array(self.codes[column], pyarrow.int32()),
+                pyarrow.array(list(self.categories[column]), pyarrow.string()))
+        columns['value_size'] = pyarrow.array(self.value_size, pyarrow.int8())
+        columns['value_type'] = pyarrow.array(self.value_type, pyarrow.uint8())
+        columns.update({c: pyarrow.array(v, pyarrow.float64()) for c, v in self.values.items()})
+
+        # Each chunk is a record batch of the stream (its dictionaries replace the previous ones)
+        batch = pyarrow.record_batch(list(columns.values()), names=list(columns.keys()))
+        if self.stream_writer is None:
+            self.stream_sink = pyarrow.OSFile(str(self.path), 'wb')
+            self.stream_writer = pyarrow.ipc.new_stream(self.stream_sink, batch.schema)
+        self.stream_writer.write_batch(batch)
+        self.stream_sink.flush()
+
+
+    def write_npz_chunk(self):
+        # Each chunk is appended to the archive as <column>/<chunk number>.npy members, along with
+        # the categories added since the previous chunk
+        columns = dict()
+        columns.update({c: numpy.frombuffer(v, numpy.float64) for c, v in self.times.items()})
+        for column in ENCODED_COLUMNS:
+            columns[column] = numpy.frombuffer(self.codes[column], numpy.int32)
+            new_categories = list(self.categories[column])[self.written_categories[column]:]
+            columns[f'{column}_categories'] = numpy.array(new_categories, dtype=str)
+            self.written_categories[column] += len(new_categories)
+        columns['value_size'] = numpy.frombuffer(self.value_size, numpy.int8)
+        columns['value_type'] = numpy.frombuffer(self.value_type, numpy.uint8)
+        columns.update({c: numpy.frombuffer(v, numpy.float64) for c, v in self.values.items()})
+
+        mode = 'w' if self.chunks_n == 0 else 'a'
+        with zipfile.ZipFile(self.path, mode, compression=zipfile.ZIP_DEFLATED) as archive:
+            for name, column in columns.items():
+                with archive.open(f'{name}/{self.chunks_n:06d}.npy', 'w') as member:
+                    numpy.lib.format.write_array(member, column, allow_pickle=False)
+
+
+def load_columnar_session(path):
+    '''Return the columns of a columnar session file as a dict of numpy arrays.
+       Dictionary-encoded columns are returned as integer codes, their categories being
+       available under the <column>_categories key.'''
+    if str(path).endswith('.arrows'):
+        with pyarrow.memory_map(str(path), 'r') as source:
+            table = pyarrow.ipc.open_stream(source).read_all()
+        table = table.unify_dictionaries()  # The codes of all the chunks refer to the same categories
+        columns = dict()
+        for name in table.column_names:
+            column = table.column(name).combine_chunks()
+            if name in ENCODED_COLUMNS:
+                columns[name] = column.indices.to_numpy()
+                columns[f'{name}_categories'] = numpy.array(column.dictionary.to_pylist(), dtype=str)
+            else:
+                columns[name] = column.to_numpy()
+        return columns
+
+    chunks = dict()
+    with zipfile.ZipFile(path) as archive:
+        for member in sorted(archive.namelist()):  # Chunks are in order
+            with archive.open(member) as f:
+                chunks.setdefault(member.split('/')[0], list()).append(numpy.lib.format.read_array(f))
+    return {name: numpy.concatenate(arrays) for name, arrays in chunks.items()}
+
+
+def iter_columnar_rows(columns):
+    '''Yield (logtime, scenario_time, type, module, address, value) rows, with typed values'''
+    categories = {c: columns[f'{c}_categories'].tolist() for c in ENCODED_COLUMNS}
+    codes = {c: columns[c].tolist() for c in ENCODED_COLUMNS}
+    values = list(zip(*[columns[c].tolist() for c in VALUE_COLUMNS]))
+    for i, (logtime, scenario_time, size, value_type) in enumerate(
+            zip(columns['logtime'].tolist(), columns['scenario_time'].tolist(),
+                columns['value_size'].tolist(), columns['value_type'].tolist())):
+        text = categories['value_text'][codes['value_text'][i]]
+        yield (logtime, scenario_time, categories['type'][codes['type'][i]],
+               categories['module'][codes['module'][i]],
+               categories['address'][codes['address'][i]],
+               decode_value(size, value_type, values[i], text))
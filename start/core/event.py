@@ -9,10 +9,14 @@ import re
 ##from core.error import errors
 ##from core.utils import get_conf_value
 
+from array import array
+from collections import namedtuple
 from core.constants import DEPRECATED
 
 class Event:
     sep = ';'
+    # Scenarios can hold many events: no instance dictionary
+    __slots__ = ('line', 'time_sec', 'plugin', 'command', 'done', 'initial_command', '_line_str')
 
     def __init__(self, line_id, time_sec, plugin, command):
         self.line = int(line_id)
@@ -20,15 +24,29 @@ class Event:
         self.plugin = plugin
         self.command = [command] if not isinstance(command, list) else command
         self.done = False
-        self.line_str = self.get_line_str()
+
+        # The line string is only formatted when needed (see line_str), from the command as
+        # created (its value can then be replaced by a validated one)
+        self.initial_command = tuple(self.command)
+        self._line_str = None
 
 
     @classmethod
     def parse_from_string(cls, line_id, line_str):
         time_str, plugin, *command = line_str.strip().split(cls.sep)
-        h, m, s = time_str.split(':')
-        time_sec = int(h) * 3600 + int(m) * 60 + int(s)
-        return cls(line_id, time_sec, plugin, command)
+        return cls(line_id, parse_time_str(time_str), plugin, command)
+
+
+    @property
+    def line_str(self) -> str:
+        if self._line_str is None:
+            self._line_str = self.get_line_str(self.initial_command)
+        return self._line_str
+
+
+    @line_str.setter
+    def line_str(self, line_str):
+        self._line_str = line_str
 
 
     def __repr__(self):
@@ -43,8 +61,8 @@ class Event:
         return len(self.command)
 
 
-    def get_line_str(self) -> str:
-        return f'{self.get_time_hms_str()}{self.sep}{self.plugin}{self.sep}{self.get_command_str()}'
+    def get_line_str(self, command=None) -> str:
+        return f'{self.get_time_hms_str()}{self.sep}{self.plugin}{self.sep}{self.get_command_str(command)}'
 
 
     def get_time_hms_str(self) -> str:
@@ -56,12 +74,62 @@ class Event:
         return "%01i:%02i:%02i" % (hours, minutes, seconds)
 
 
-    def get_command_str(self) -> str:
-        if len(self) == 1:
-            return self.command[0]
-        elif len(self) == 2:
-            return f'{self.command[0]}{self.sep}{self.command[1]}'
+    def get_command_str(self, command=None) -> str:
+        command = self.command if command is None else command
+        if len(command) == 1:
+            return command[0]
+        elif len(command) == 2:
+            return f'{command[0]}{self.sep}{command[1]}'
 
 
     def is_deprecated(self) -> bool:
         return self.plugin in DEPRECATED or (len(self.command) > 0 and self.command[0] in DEPRECATED)
+
+
+def parse_time_str(time_str):
+    '''Convert a H:MM:SS string into seconds (raise a ValueError if it is not valid)'''
+    h, m, s = time_str.split(':')
+    return int(h) * 3600 + int(m) * 60 + int(s)
+
+
+# A scenario parsed in bulk: one entry per event in the parallel arrays (lines, times,
+# plugin_ids, command_ids), whose ids index the plugins and commands lists (each distinct
+# plugin name or command is stored once)
+ParsedScenario = namedtuple('ParsedScenario', ['lines', 'times', 'plugin_ids', 'command_ids',
+                                               'plugins', 'commands', 'invalid_lines'])
+
+
+def parse_scenario(contents):
+    '''Parse the lines of a scenario in a single pass (empty and commented [#] lines are
+       squeezed). The numbers of the lines that are not valid events are returned in
+       invalid_lines.'''
+    lines, times, plugin_ids, command_ids = array('L'), array('l'), array('L'), array('L')
+    plugins, commands, invalid_lines = dict(), dict(), list()
+    times_sec = dict()  # Generated scenarios repeat the same times
+
+    for line_n, line_str in enumerate(contents):
+        if len(line_str.strip()) == 0 or line_str.startswith("#"):
+            continue
+        try:
+            time_str, plugin, *command = line_str.strip().split(Event.sep)
+            if time_str not in times_sec:
+                times_sec[time_str] = parse_time_str(time_str)
+        except ValueError:
+            invalid_lines.append(line_n)
+            continue
+
+        lines.append(line_n)
+        times.append(times_sec[time_str])
+        plugin_ids.append(plugins.setdefault(plugin, len(plugins)))
+        command_ids.append(commands.setdefault(tuple(command), len(commands)))
+
+    return ParsedScenario(lines, times, plugin_ids, command_ids, list(plugins), list(commands),
+                          invalid_lines)
+
+
+def get_parsed_events(parsed):
+    '''Create the events of a parsed scenario (each with its own command list)'''
+    plugins, commands = parsed.plugins, parsed.commands
+    return [Event(line_n, time_sec, plugins[plugin_id], list(commands[command_id]))
+            for line_n, time_sec, plugin_id, command_id
+            in zip(parsed.lines, parsed.times, parsed.plugin_ids, parsed.command_ids)]
@@ -0,0 +1,132 @@
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+# Headless mode (main.py --headless [--speed max|<factor>])
+# No window is opened and no GL object is created: the batch and the labels below only keep
+# the data the plugins and widgets read back (vertices, colors, texts). The scenario is run
+# by the virtual clock, and the session is logged as usual.
+# A session can also be replayed headless (main.py -r <session_id> --headless), from its
+# beginning to its end, without pause.
+
+from core.constants import HEADLESS_SCREEN_SIZE
+from core.window import Window
+
+
+class HeadlessVertexList:
+    def __init__(self, count, mode, group, *data):
+        self.count = count
+        self.mode = mode
+        self.group = group
+        self.vertices = list()
+        self.colors = list()
+
+        for attribute in data:
+            fmt, values = attribute[0], list(attribute[1]) if len(attribute) > 1 else list()
+            if fmt.startswith('v'):
+                self.vertices = values
+            elif fmt.startswith('c'):
+                self.colors = values
+
+
+    def resize(self, count):
+        self.count = count
+
+
+    def delete(self):
+        pass
+
+
+class HeadlessBatch:
+    def add(self, count, mode, group, *data):
+        return HeadlessVertexList(count, mode, group, *data)
+
+
+    def add_indexed(self, count, mode, group, indices, *data):
+        return HeadlessVertexList(count, mode, group, *data)
+
+
+    def draw(self):
+        pass
+
+
+class HeadlessLabel:
+    '''Keep the text and the attributes of a (HTML) label, without any font rendering'''
+    def __init__(self, text='', x=0, y=0, batch=None, **kwargs):
+        self.__dict__.update(kwargs)
+        self.text = text
+        self.x = x
+        self.y = y
+        self.batch = batch
+        self.content_width = 0
+        self.content_height = 0
+
+
+    def delete(self):
+        self.batch = None
+
+
+    def draw(self):
+        pass
+
+
+class HeadlessWindow:
+    '''
+    Replaces the MATB window in headless mode. It provides what the scheduler, the plugins and
+    the widgets use (containers, batch, keyboard state...), but receives no input.
+    '''
+    CURSOR_DEFAULT = None
+    CURSOR_SIZE_LEFT_RIGHT = None
+
+    def __init__(self):
+        Window.MainWindow = self
+
+        self._width, self._height = HEADLESS_SCREEN_SIZE
+        self.width, self.height = HEADLESS_SCREEN_SIZE
+        self.containers = None
+
+        self.batch = HeadlessBatch()
+        self.keyboard = dict()
+        self.alive = True
+        self.modal_dialog = None
+        self.slider_visible = False
+        self.invalid = True
+
+        self.on_key_press_replay = None
+
+
+    # Placements are computed exactly as in the MATB window
+    get_container_list = Window.get_container_list
+    get_containers = Window.get_containers
+    get_container = Window.get_container
+    exit = Window.exit
+
+
+    def push_handlers(self, *args, **kwargs):
+        pass
+
+
+    def set_mouse_visible(self, visible=True):
+        pass
+
+
+    def get_system_mouse_cursor(self, name):
+        return None
+
+
+    def set_mouse_cursor(self, cursor=None):
+        pass
+
+
+    def close(self):
+        pass
+
+
+    def open_modal_window(self, pass_list, title, continue_key, exit_key):
+        # Nobody can read a dialog: print it, and exit if it can not be continued
+        print(title)
+        for msg in pass_list:
+            print(msg)
+
+        if continue_key is None:
+            self.exit()
@@ -0,0 +1,115 @@
+# Copyright 2023-2024, by Julien Cegarra & Benoît Valéry. All rights reserved.
+# Institut National Universitaire Champollion (Albi, France).
+# License : CeCILL, version 2.1 (see the LICENSE file)
+
+import random
+from collections import deque
+from core.logger import logger
+from core.rollingmetric import RollingMetric
+
+# Plugins states flags are not copied as attributes, they are restored through the plugins methods
+PLUGIN_FLAGS = ['alive', 'paused', 'visible', 'blocking']
+
+# Marks a value that can not be part of a keyframe (widgets, plugins, audio players...)
+SKIP = object()
+
+
+def copy_state(value):
+    '''Deep copy the plain data of a value (None, numbers, strings and their containers).
+       In dictionaries, entries that are not plain data are dropped.'''
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    elif isinstance(value, dict):
+        copied = {k: copy_state(v) for k, v in value.items()}
+        return {k: v for k, v in copied.items() if v is not SKIP}
+    elif isinstance(value, (list, tuple, set)):
+        copied = [copy_state(v) for v in value]
+        if any([v is SKIP for v in copied]):
+            return SKIP
+        return type(value)(copied)
+    elif isinstance(value, RollingMetric):
+        return value.copy()
+    return SKIP
+
+
+def merge_state(current, saved):
+    '''Return a copy of the saved value. Dictionaries are merged into the current ones, so their
+       entries that could not be saved (e.g., widgets) are kept.'''
+    if isinstance(current, dict) and isinstance(saved, dict):
+        for k, v in saved.items():
+            current[k] = merge_state(current.get(k), v)
+        return current
+    return copy_state(saved)
+
+
+class Keyframe:
+    '''
+    A snapshot of the replay at a given scenario time: plugins parameters and internal states,
+    random generators states and scenario cursor. Restoring a keyframe into a freshly restarted
+    scenario avoids to re-simulate the session from its beginning.
+    '''
+    def __init__(self, scheduler):
+        self.scenario_time = scheduler.scenario_time
+        self.random_state = random.getstate()
+
+        # Scenario cursor, and events that are due but not executed yet
+        self.events_cursor = scheduler.events_cursor
+        self.pending_events = [i for i, e in enumerate(scheduler.events_index[:self.events_cursor])
+                               if e.done != 1]
+        self.scenario_paused = scheduler.pause_scenario_time
+        self.paused_plugins = [n for n, p in scheduler.plugins.items() if p in scheduler.paused_plugins]
+
+        self.plugins = {name: self.capture_plugin(plugin)
+                        for name, plugin in scheduler.plugins.items()}
+
+
+    def capture_plugin(self, plugin):
+        state = {k: copy_state(v) for k, v in vars(plugin).items() if k not in PLUGIN_FLAGS}
+        return dict(started=len(plugin.widgets) > 0,
+                    flags={f: getattr(plugin, f) for f in PLUGIN_FLAGS},
+                    state={k: v for k, v in state.items() if v is not SKIP})
+
+
+    def restore(self, scheduler):
+        # The scheduler must have been restarted (fresh plugins instances)
+        for name, saved in self.plugins.items():
+            self.restore_plugin(scheduler.plugins[name], saved)
+
+        events = scheduler.events_index
+        for i, event in enumerate(events[:self.events_cursor]):
+            event.done = 0 if i in self.pending_events else 1
+        scheduler.events_cursor = self.events_cursor
+        scheduler.events_queue = deque([events[i] for i in self.pending_events])
+
+        scheduler.scenario_time = self.scenario_time
+        logger.set_scenario_time(self.scenario_time)
+        scheduler.pause_scenario_time = self.scenario_paused
+        scheduler.paused_plugins = [scheduler.plugins[n] for n in self.paused_plugins]
+        random.setstate(self.random_state)
+
+        for plugin in scheduler.plugins.values():
+            scheduler.on_plugin_state_change(plugin)
+
+
+    def restore_plugin(self, plugin, saved):
+        flags = saved['flags']
+
+        # Parameters are restored before the widgets creation, and again after it
+        # because some plugins modify them when they start
+        self.restore_attributes(plugin, saved['state'])
+        if saved['started']:
+            plugin.start()
+            if not flags['alive']:
+                plugin.stop()
+            else:
+                if flags['paused']:
+                    plugin.pause()
+                if not flags['visible']:
+                    plugin.hide()
+        self.restore_attributes(plugin, saved['state'])
+        plugin.blocking = flags['blocking']
+
+
+    def restore_attributes(self, plugin, state):
+        for name, value in state.items():
+            setattr(plugin, name, merge_state(getattr(plugin, name, None), value))
@@ -2,12 +2,45 @@
 # Institut National Universitaire Champollion (Albi, France).
 # License : CeCILL, version 2.1 (see the LICENSE file)
 
+import atexit
 from collections import namedtuple
+from queue import SimpleQueue, Empty
+from threading import Thread, Event
 from time import perf_counter
 from datetime import datetime
 from csv import DictWriter
-from core.constants import PATHS, REPLAY_MODE
-from core.utils import find_the_first_available_session_number, find_the_last_session_number
+from core.constants import PATHS, REPLAY_MODE, HEADLESS_MODE
+from core.utils import find_the_first_available_session_number, reserve_session_number
+from core.utils import has_conf_value, get_conf_value, get_argv_value
+from core.columnar import ColumnarLog, get_columnar_suffix
+
+def is_plain_data(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return True
+    elif isinstance(value, (list, tuple, set)):
+        return all([is_plain_data(v) for v in value])
+    elif isinstance(value, dict):
+        return all([is_plain_data(k) and is_plain_data(v) for k, v in value.items()])
+    return False
+
+
+def copy_plain_data(value):
+    if isinstance(value, (list, tuple, set)):
+        return type(value)(copy_plain_data(v) for v in value)
+    elif isinstance(value, dict):
+        return {k: copy_plain_data(v) for k, v in value.items()}
+    return value
+
+
+def freeze_value(value):
+    '''Return a copy of a logged value that can not change anymore: plain data (numbers,
+       strings and their containers) is copied, other objects are logged as text'''
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    elif is_plain_data(value):
+        return copy_plain_data(value)
+    return str(value)
+
 
 class Logger:
     def __init__(self):
@@ -18,7 +51,14 @@ class Logger:
         self.session_id = None
         self.lsl = None
 
-        self.session_id = find_the_first_available_session_number()
+        # In headless mode, the session number can be imposed
+        if REPLAY_MODE:
+            self.session_id = find_the_first_available_session_number()
+        elif HEADLESS_MODE and get_argv_value('--session') is not None:
+            self.session_id = reserve_session_number(self.datetime,
+                                                     int(get_argv_value('--session')))
+        else:
+            self.session_id = reserve_session_number(self.datetime)
         self.mode = 'w'
 
         self.scenario_time = 0  # Updated by the scheduler class
@@ -27,12 +67,29 @@ class Logger:
         self.writer = None
         self.queue = list()
 
+        # Asynchronous mode: the render thread only enqueues rows, which are formatted
+        # and written by batches from a background thread
+        self.asynchronous = (has_conf_value('Openmatb', 'asynchronous_logging')
+                             and get_conf_value('Openmatb', 'asynchronous_logging'))
+        self.flush_interval = (get_conf_value('Openmatb', 'logging_flush_interval')
+                               if has_conf_value('Openmatb', 'logging_flush_interval') else 0.5)
+        self.async_queue = SimpleQueue()
+        self.writer_thread = None
+        self.stop_writing = Event()
+
+        self.columnar = None
         if not REPLAY_MODE:
             self.path = PATHS['SESSIONS'].joinpath(self.datetime.strftime("%Y-%m-%d"),
                                 f'{self.session_id}_{self.datetime.strftime("%y%m%d_%H%M%S")}.csv')
             self.path.parent.mkdir(parents=True, exist_ok=True)
             self.open()
 
+            # Optionally, keep a typed columnar copy of the session (written by chunks)
+            if (has_conf_value('Openmatb', 'columnar_session')
+                    and get_conf_value('Openmatb', 'columnar_session')
+                    and get_columnar_suffix() is not None):
+                self.columnar = ColumnarLog(self.path.with_suffix(get_columnar_suffix()))
+
     # TODO: see if we can/should merge record_* methods into one
     def record_event(self, event):
         if len(event.command) == 1:
@@ -76,12 +133,16 @@ class Logger:
 
 
     def record_a_pseudorandom_value(self, module, seed, output):
-        slot = [perf_counter(), self.scenario_time, 'seed_value', module, '', seed]
-        self.write_single_slot(slot)
+        self.record_a_pseudorandom_seed(module, seed)
         slot = [perf_counter(), self.scenario_time, 'seed_output', module, '', output]
         self.write_single_slot(slot)
 
 
+    def record_a_pseudorandom_seed(self, module, seed):
+        slot = [perf_counter(), self.scenario_time, 'seed_value', module, '', seed]
+        self.write_single_slot(slot)
+
+
     def log_manual_entry(self, entry, key='manual'):
         slot = [perf_counter(), self.scenario_time, key, '', '', entry]
         self.write_single_slot(slot)
@@ -93,7 +154,7 @@ class Logger:
 
 
     def __exit__(self, type, value, traceback):
-        self.file.close()
+        self.close()
 
 
     def open(self):
@@ -103,9 +164,53 @@ class Logger:
         if create_header:
             self.writer.writeheader()
 
+        if self.asynchronous:
+            self.start_writer_thread()
+
 
     def close(self):
-        self.file.close()
+        # Rows that are still enqueued are written before the file is closed
+        self.stop_writer_thread()
+        if self.file is not None and not self.file.closed:
+            self.file.close()
+            if self.columnar is not None:
+                self.columnar.close()
+
+
+    def start_writer_thread(self):
+        self.stop_writing.clear()
+        self.writer_thread = Thread(target=self.write_batches, name='logger', daemon=True)
+        self.writer_thread.start()
+        atexit.register(self.close)
+
+
+    def stop_writer_thread(self):
+        if self.writer_thread is None:
+            return
+        self.stop_writing.set()
+        self.writer_thread.join()
+        self.writer_thread = None
+
+
+    def write_batches(self):
+        # Background thread: periodically write all the enqueued rows at once
+        while not self.stop_writing.wait(self.flush_interval):
+            self.write_async_queue()
+        self.write_async_queue()  # Drain the queue before leaving
+
+
+    def write_async_queue(self):
+        rows_n = 0
+        while True:
+            try:
+                values = self.async_queue.get_nowait()
+            except Empty:
+                break
+            self.write_row(self.slot(*values))
+            rows_n += 1
+
+        if rows_n > 0:
+            self.file.flush()
 
 
     def add_row_to_queue(self, row):
@@ -130,17 +235,31 @@ class Logger:
                 print(_('Warning, queue is empty'))
             else:
                 for this_row in self.queue:
-                    row_dict = self.round_row(this_row)._asdict()
-                    if change_dict is not None:
-                        for k,v in change_dict.items():
-                            row_dict[k] = v
-                    self.writer.writerow(row_dict)
-                    if self.lsl is not None:
-                        self.lsl.push(';'.join([str(r) for r in row_dict.values()]))
+                    self.write_row(this_row, change_dict)
                 self.empty_queue()
 
 
+    def write_row(self, row, change_dict=None):
+        row_dict = self.round_row(row)._asdict()
+        if change_dict is not None:
+            for k,v in change_dict.items():
+                row_dict[k] = v
+        self.writer.writerow(row_dict)
+        if self.columnar is not None:
+            self.columnar.append(row)
+        if self.lsl is not None:  # Buffered by the LSL plugin, with the log time as timestamp
+            self.lsl.push(';'.join([str(r) for r in row_dict.values()]), row.logtime)
+            if row.type == 'state':
+                self.lsl.push_state(row.module, row.address, row.value, row.logtime)
+
+
     def write_single_slot(self, values):
+        # In asynchronous mode, only enqueue a compact tuple (the writer thread formats it).
+        # As the row is written later, its value is copied (it could be modified meanwhile)
+        if self.writer_thread is not None:
+            self.async_queue.put((*values[:-1], freeze_value(values[-1])))
+            return
+
         row = self.slot(*values)
         self.add_row_to_queue(row)
         self.write_row_queue()
@@ -97,6 +97,7 @@ class ModalDialog:
         self.html_label.y = self.container.cy
 
         self.vertices = [self.html_label, self.back_dialog, self.border_dialog, self.back_vertice]
+        self.win.invalid = True
 
 
     def on_delete(self):
@@ -106,6 +107,7 @@ class ModalDialog:
                 v.delete()
         logger.log_manual_entry(f"{self.name} end", key='dialog')
         self.win.modal_dialog = None
+        self.win.invalid = True
 
 
     def on_exit(self):
@@ -3,57 +3,83 @@
 # License : CeCILL, version 2.1 (see the LICENSE file)
 
 import random
-from core.constants import REPLAY_MODE
-from core.utils import find_the_last_session_number
+from core.constants import REPLAY_MODE, HEADLESS_MODE
+from core.utils import find_the_last_session_number, get_argv_value, get_conf_value, has_conf_value
 from core.logger import logger
-from rstr import xeger as rstrxeger
+from rstr import Rstr
 
 
 SESSION_ID = logger.session_id if REPLAY_MODE == False else find_the_last_session_number()
-plugins_using_seed = ['communications', 'sysmon'] 		# Used to convert a plugin alias into 
+
+# In headless mode, the pseudorandom values can be seeded independently of the session number
+if HEADLESS_MODE and get_argv_value('--seed') is not None:
+	SESSION_ID = int(get_argv_value('--seed'))
+
+# With a compact seed log, only the seed of each new stream is logged (instead of the seed
+# and the output of each draw)
+COMPACT_SEED_LOG = (has_conf_value('Openmatb', 'compact_seed_log')
+					and get_conf_value('Openmatb', 'compact_seed_log'))
+
+plugins_using_seed = ['communications', 'sysmon'] 		# Used to convert a plugin alias into
 														# a unique integer
 
 def plugin_alias_to_int(plugin_alias):
 	return plugins_using_seed.index(plugin_alias)
 
 
-def set_seed(plugin_alias, scenario_time_sec, add=0):
-	# `add` is used in case multiple seeds must be generated at the same time (second precision)
-	unique_plugin_int = plugin_alias_to_int(plugin_alias)
-	seed = int(SESSION_ID) + unique_plugin_int + int(scenario_time_sec) + add
-	random.seed(seed)
+# Each draw depends only on the session, the plugin, the scenario second and `add` (used in case
+# multiple seeds must be generated at the same time), as when the global random module was reseeded
+# before each draw. The generators are cached instead: a generator is created once per
+# (plugin, second, add) key, and every draw restarts from its seeded state. Plugins disturb
+# neither each other nor the global random module.
+streams = dict()	# plugin alias: (scenario second, {add: (seed, seeded state, generator, regex generator)})
 
 
-def choice(arg, plugin_name, scenario_time, add=1):
-	seed = set_seed(plugin_name, scenario_time, add)
-	output = random.choice(arg)
-	logger.record_a_pseudorandom_value(plugin_name, seed, output)
+def get_stream(plugin_alias, scenario_time_sec, add):
+	second = int(scenario_time_sec)
+	if plugin_alias not in streams or streams[plugin_alias][0] != second:
+		streams[plugin_alias] = (second, dict())	# Only the streams of the current second are kept
+
+	second_streams = streams[plugin_alias][1]
+	if add not in second_streams:
+		seed = int(SESSION_ID) + plugin_alias_to_int(plugin_alias) + second + add
+		generator = random.Random(seed)
+		second_streams[add] = (seed, generator.getstate(), generator, Rstr(generator))
+		if COMPACT_SEED_LOG:
+			logger.record_a_pseudorandom_seed(plugin_alias, seed)
+
+	seed, seeded_state, generator, regex_generator = second_streams[add]
+	generator.setstate(seeded_state)
+	return seed, generator, regex_generator
+
+
+def draw(plugin_name, scenario_time, add, method, *args):
+	seed, generator, regex_generator = get_stream(plugin_name, scenario_time, add)
+	if method == 'xeger':
+		output = regex_generator.xeger(*args)
+	else:
+		output = getattr(generator, method)(*args)
+
+	if not COMPACT_SEED_LOG:
+		logger.record_a_pseudorandom_value(plugin_name, seed, output)
 	return output
 
 
+def choice(arg, plugin_name, scenario_time, add=1):
+	return draw(plugin_name, scenario_time, add, 'choice', arg)
+
+
 def sample(arg, plugin_name, scenario_time, add):
-	seed = set_seed(plugin_name, scenario_time, add)
-	output = random.sample(arg, 1)[0]
-	logger.record_a_pseudorandom_value(plugin_name, seed, output)
-	return output
+	return draw(plugin_name, scenario_time, add, 'sample', arg, 1)[0]
 
 
 def randint(arg1, arg2, plugin_name, scenario_time):
-	seed = set_seed(plugin_name, scenario_time)
-	output = random.randint(arg1, arg2)
-	logger.record_a_pseudorandom_value(plugin_name, seed, output)
-	return output	
+	return draw(plugin_name, scenario_time, 0, 'randint', arg1, arg2)
 
 
 def uniform(arg1, arg2, plugin_name, scenario_time, add):
-	seed = set_seed(plugin_name, scenario_time, add)
-	output = random.uniform(arg1, arg2)
-	logger.record_a_pseudorandom_value(plugin_name, seed, output)
-	return output
+	return draw(plugin_name, scenario_time, add, 'uniform', arg1, arg2)
 
 
 def xeger(call_rgx, plugin_name, scenario_time, add):
-	seed = set_seed(plugin_name, scenario_time, add)
-	output = rstrxeger(call_rgx)
-	logger.record_a_pseudorandom_value(plugin_name, seed, output)
-	return output
+	return draw(plugin_name, scenario_time, add, 'xeger', call_rgx)
@@ -3,15 +3,16 @@
 # License : CeCILL, version 2.1 (see the LICENSE file)
 
 import sys
-from pyglet.app import EventLoop
+from collections import deque
 from core.event import Event
 from core.clock import Clock
 from core.modaldialog import ModalDialog
 from core.logger import logger
-from core.utils import get_conf_value
-from core.constants import REPLAY_MODE
+from core.profiler import profiler
+from core.utils import get_conf_value, get_headless_speed
+from core.constants import REPLAY_MODE, HEADLESS_MODE, HEADLESS_FRAME_DURATION
 from core.error import errors
-from core.window import Window
+from core.window import Window, EventLoop
 from core.scenario import Scenario
 from core.joystick import joystick
 
@@ -33,7 +34,10 @@ class Scheduler:
         self.joystick = joystick
         self.set_scenario()
 
-        self.event_loop.run()
+        if HEADLESS_MODE:
+            self.clock.run_headless(HEADLESS_FRAME_DURATION, get_headless_speed())
+        else:
+            self.event_loop.run()
 
     def set_scenario(self, events = None):
         self.scenario = Scenario(events)
@@ -45,6 +49,7 @@ class Scheduler:
         for p in self.plugins:
             self.plugins[p].win = Window.MainWindow
             self.plugins[p].joystick = self.joystick
+            self.plugins[p].scheduler = self
             if not REPLAY_MODE:
                 Window.MainWindow.push_handlers(self.plugins[p].on_key_press,
                                        self.plugins[p].on_key_release)
@@ -54,13 +59,26 @@ class Scheduler:
         self.pause_scenario_time = False
         self.scenario_time = 0
 
-        # We store events in a list in case their execution is delayed by a blocking event
-        self.events_queue = list()
+        # We store events in a queue in case their execution is delayed by a blocking event
+        self.events_queue = deque()
+
+        # Events are indexed by (time_sec, line) and browsed with a moving cursor, so that
+        # each update only considers the events that have become due since the last one
+        self.events_index = sorted(self.events, key=lambda e: (e.time_sec, e.line))
+        self.events_cursor = 0
+
         self.blocking_plugin = None
 
         # Store the plugins that could be paused by a *blocking* event
         self.paused_plugins = list()
 
+        # Plugins states are cached (and updated by the plugins themselves on each state change)
+        # so that the plugins lists needed at each update are not recomputed every frame
+        self.plugins_states = {state: set() for state in ['alive', 'blocking', 'paused']}
+        for plugin in self.plugins.values():
+            self.on_plugin_state_change(plugin)
+        self.update_plugins_lists()  # Even without any plugin (e.g., invalid scenario)
+
 
     def update(self, dt):
         if Window.MainWindow.modal_dialog is not None:
@@ -68,10 +86,11 @@ class Scheduler:
         elif errors.is_empty() == False:
             errors.show_errors()
 
-        self.update_timers(dt)
-        self.update_joystick()
-        self.update_active_plugins()
-        self.execute_events()
+        profiler.new_frame()
+        profiler.measure(('scheduler', 'update_timers'), self.update_timers, dt)
+        profiler.measure(('scheduler', 'update_joystick'), self.update_joystick)
+        profiler.measure(('scheduler', 'update_active_plugins'), self.update_active_plugins)
+        profiler.measure(('scheduler', 'execute_events'), self.execute_events)
         self.check_if_must_exit()
 
 
@@ -178,17 +197,37 @@ class Scheduler:
 
 
     def get_active_blocking_plugin(self):
-        p = self.get_plugins_by_states([('blocking', True), ('paused', False)])
+        p = self.active_blocking_plugins
         if len(p) > 0:
             return p[0]
 
 
     def get_active_non_blocking_plugins(self):
-        return self.get_plugins_by_states([('blocking', False), ('paused', False)])
+        return self.active_non_blocking_plugins
 
 
     def get_active_plugins(self):
-        return self.get_plugins_by_states([('alive', True)])
+        return self.active_plugins
+
+
+    def on_plugin_state_change(self, plugin):
+        # Called by a plugin each time it is started, stopped, paused, resumed or unblocked
+        for state, plugins_set in self.plugins_states.items():
+            if getattr(plugin, state) == True:
+                plugins_set.add(plugin)
+            else:
+                plugins_set.discard(plugin)
+        self.update_plugins_lists()
+
+
+    def update_plugins_lists(self):
+        # Keep the plugins order of the scenario
+        alive, blocking, paused = [self.plugins_states[s] for s in ['alive', 'blocking', 'paused']]
+        self.active_plugins = [p for p in self.plugins.values() if p in alive]
+        self.active_blocking_plugins = [p for p in self.plugins.values()
+                                        if p in blocking and p not in paused]
+        self.active_non_blocking_plugins = [p for p in self.plugins.values()
+                                            if p not in blocking and p not in paused]
 
 
     def execute_one_event(self, event):
@@ -232,19 +271,18 @@ class Scheduler:
 
     def get_event_at_scenario_time(self, scenario_time: float):
         # Retrieve (simultaneous) events matching scenario_duration_sec
-        # We look to the most precise point in the near future that might matches a set of event time(s)
-        events_time = [event for event in self.events
-                       if event.time_sec <= scenario_time]
-
-        # Filter events that are either done or already in the queue
-        events_time = [event for event in events_time
-                       if event.done != 1]
+        # Move the cursor forward into the time-sorted index, until the first event of the future
+        due_events = list()
+        while self.events_cursor < len(self.events_index) \
+                and self.events_index[self.events_cursor].time_sec <= scenario_time:
+            event = self.events_index[self.events_cursor]
+            if event.done != 1:
+                due_events.append(event)
+            self.events_cursor += 1
 
         # Sort them according to their line number (ascending order)
         # and append the listed events in the correct order
-        for event in sorted(events_time, key=lambda x: x.line):
-            if event not in self.events_queue:
-                self.events_queue.append(event)
+        self.events_queue.extend(sorted(due_events, key=lambda x: x.line))
 
         return self.unqueue_event()
 
@@ -252,15 +290,16 @@ class Scheduler:
     def unqueue_event(self):
         # If some events must be executed, unstack the next event
         if len(self.events_queue) > 0:
-            event = self.events_queue[0]
-            del self.events_queue[0]
-            return event
+            return self.events_queue.popleft()
 
         return None
 
 
     def exit(self):
         logger.log_manual_entry('end')
+        if not REPLAY_MODE:
+            profiler.write_summary(logger.path)
+        logger.close()  # Write the remaining rows (asynchronous logging)
         self.event_loop.exit()
         Window.MainWindow.close() # needed for windows clean exit
         sys.exit(0)
@@ -3,7 +3,17 @@
 # License : CeCILL, version 2.1 (see the LICENSE file)
 from pyglet import font
 from core.constants import PATHS as P, CONFIG
-import sys
+from contextlib import contextmanager
+from time import perf_counter, sleep, time
+from hashlib import sha256
+import sys, os, json, hmac, secrets
+
+# Some caches (compiled scenarios, parsed replay sessions) are pickled, and unpickling a file can
+# execute code. As scenarios and session folders can be received from someone else, these caches
+# are signed with a secret key of this installation (created when first needed), and are only
+# unpickled if their signature is valid.
+CACHE_SECRET_PATH = P['PLUGINS'].parent.joinpath('.cache_key')
+cache_secret = None
 
 def clamp(x, val_min, val_max):
     if x < val_min:
@@ -13,6 +23,42 @@ def clamp(x, val_min, val_max):
     return x
 
 
+def get_cache_secret():
+    '''Return the secret key of this installation (None if it can not be read or created)'''
+    global cache_secret
+    if cache_secret is None:
+        try:
+            fd = os.open(CACHE_SECRET_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o600)
+        except FileExistsError:
+            try:
+                cache_secret = CACHE_SECRET_PATH.read_bytes()
+            except OSError:
+                return None
+        except OSError:
+            return None
+        else:
+            cache_secret = secrets.token_bytes(32)
+            with os.fdopen(fd, 'wb') as secret_file:
+                secret_file.write(cache_secret)
+    return cache_secret if len(cache_secret) > 0 else None
+
+
+def sign_payload(payload):
+    '''Return the payload preceded by its signature (None if there is no secret key)'''
+    secret = get_cache_secret()
+    if secret is not None:
+        return hmac.new(secret, payload, sha256).digest() + payload
+
+
+def get_signed_payload(data):
+    '''Return the payload of signed data (None if its signature is not valid)'''
+    secret = get_cache_secret()
+    if secret is not None:
+        signature, payload = data[:sha256().digest_size], data[sha256().digest_size:]
+        if hmac.compare_digest(signature, hmac.new(secret, payload, sha256).digest()):
+            return payload
+
+
 def get_session_numbers():
     try:
         session_numbers = [int(s.name.split('_')[0])
@@ -23,37 +69,118 @@ def get_session_numbers():
     return session_numbers
 
 
-def find_the_first_available_session_number():
-    session_numbers = get_session_numbers()
-    first_avail = None
+# Session numbers are allocated through a small index file (sessions/session_index.json), which
+# holds the last session number and the free numbers below it (e.g., manually removed sessions).
+# So the sessions folder is only browsed when the index must be (re)built, i.e., when it is missing.
+def build_session_index():
+    session_numbers = set(get_session_numbers())
+    last = max(session_numbers, default=0)
+    index = dict(last=last, free=[n for n in range(1, last) if n not in session_numbers])
+    write_session_index(index)
+    return index
 
-    # Take max session number + 1, and find the minimum available number into [1, max+1]
-    # If no session has been manually removed, it will be max+1
-    if len(session_numbers) == 0:
-        first_avail = 1
-    else:
-        for n in range(1, max(session_numbers)+1):
-            if n not in session_numbers and first_avail is None:
-                first_avail = n
 
-    if first_avail is None:
-        first_avail = max(session_numbers) + 1
+def read_session_index():
+    try:
+        index = json.loads(P['SESSION_INDEX'].read_text())
+        return dict(last=int(index['last']), free=sorted([int(n) for n in index['free']]))
+    except (OSError, ValueError, KeyError, TypeError):
+        return build_session_index()
+
+
+def write_session_index(index):
+    # Write a temporary file first, so that the index is replaced atomically
+    temp_path = P['SESSION_INDEX'].with_name(f"{P['SESSION_INDEX'].name}.{os.getpid()}.tmp")
+    temp_path.write_text(json.dumps(index))
+    os.replace(temp_path, P['SESSION_INDEX'])
+
+
+def is_session_number_used(number, date):
+    # Only the folder where the session file of this date would be written is browsed
+    return any(P['SESSIONS'].joinpath(date.strftime('%Y-%m-%d')).glob(f'{number}_*.csv'))
+
 
-    return first_avail
+def is_session_number_free(index, number):
+    return number > index['last'] or number in index['free']
+
+
+def get_first_free_session_number(index):
+    return index['free'][0] if len(index['free']) > 0 else index['last'] + 1
+
+
+@contextmanager
+def session_index_lock(timeout=5):
+    # Processes that start simultaneously (e.g., batch simulations) allocate their numbers
+    # one at a time. A lock older than the timeout is considered as left by a crashed process,
+    # and is broken. Otherwise, if the lock can not be taken before the timeout, an error is raised.
+    lock_path = P['SESSION_INDEX'].with_suffix('.lock')
+    deadline = perf_counter() + timeout
+    lock = None
+    while lock is None:
+        try:
+            lock = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                lock_age = time() - lock_path.stat().st_mtime
+            except FileNotFoundError:  # Released meanwhile
+                continue
+            if lock_age > timeout:
+                lock_path.unlink(missing_ok=True)
+            elif perf_counter() < deadline:
+                sleep(0.01)
+            else:
+                raise TimeoutError(_('The session index is locked by another process (%s)')
+                                   % lock_path)
+    try:
+        yield
+    finally:
+        os.close(lock)
+        lock_path.unlink(missing_ok=True)
+
+
+def reserve_session_number(date, number=None):
+    '''Record a new session of the given date into the index, and return its number.
+       If no number is imposed, the first available one is taken.'''
+    with session_index_lock():
+        index = read_session_index()
+        candidate = get_first_free_session_number(index) if number is None else number
+
+        # The index ignores the session files that were copied (or removed) manually:
+        # if the number is already taken by a file, the index is rebuilt from the folder
+        if not is_session_number_free(index, candidate) or is_session_number_used(candidate, date):
+            index = build_session_index()
+            candidate = get_first_free_session_number(index) if number is None else number
+            if not is_session_number_free(index, candidate):  # An imposed number is never reused
+                raise FileExistsError(_('The session number %s is already used') % candidate)
+        number = candidate
+
+        if number > index['last']:
+            index['free'] += list(range(index['last'] + 1, number))
+            index['last'] = number
+        elif number in index['free']:
+            index['free'].remove(number)
+        write_session_index(index)
+    return number
+
+
+def find_the_first_available_session_number():
+    # Take the minimum free number into [1, last], or last+1
+    # If no session has been manually removed, it will be last+1
+    return get_first_free_session_number(read_session_index())
 
 
 def find_the_last_session_number():
-    session_numbers = get_session_numbers()
-    return max(session_numbers)
+    return read_session_index()['last']
 
 def has_conf_value(section, key):
-    return key in CONFIG
+    return section in CONFIG and key in CONFIG[section]
 
 def get_conf_value(section, key, val_type=None):
     value = CONFIG[section][key]
 
     # Boolean boolean values
-    if key in ['fullscreen', 'highlight_aoi', 'hide_on_pause', 'display_session_number']:
+    if key in ['fullscreen', 'highlight_aoi', 'hide_on_pause', 'display_session_number',
+               'asynchronous_logging', 'columnar_session', 'compact_seed_log', 'profiling']:
         if value.strip().lower() == 'true':
             return True
         elif value.strip().lower() == 'false':
@@ -72,7 +199,7 @@ def get_conf_value(section, key, val_type=None):
             return value
 
     # Float values
-    elif key in ['clock_speed']:
+    elif key in ['clock_speed', 'logging_flush_interval']:
         try:
             value = float(value)
         except:
@@ -82,8 +209,8 @@ def get_conf_value(section, key, val_type=None):
 
     # List values
     elif key in ['top_bounds', 'bottom_bounds']:
-        try:
-            value = eval(value)
+        try:  # Parsed (not evaluated), like [0.35, 0.85]
+            value = [float(v) for v in value.strip().strip('[]()').split(',')]
         except:
             raise TypeError(_(f"In config.ini, [%s] parameter must be a list of floats (not %s)") % (key, value))
         else:
@@ -109,4 +236,18 @@ def get_replay_session_id()->int:
     elif has_conf_value('Replay', 'replay_session_id'):
         return int(get_conf_value('Replay', 'replay_session_id'))
     else:
-        return int(find_the_last_session_number())
\ No newline at end of file
+        return int(find_the_last_session_number())
+
+
+def get_argv_value(option, default=None):
+    '''Return the command line value that follows an option (e.g., --speed 10)'''
+    if option in sys.argv[:-1]:
+        return sys.argv[sys.argv.index(option) + 1]
+    return default
+
+
+def get_headless_speed():
+    '''Return the speed factor given after --speed. None (or "max") means as fast as possible'''
+    speed = get_argv_value('--speed', 'max')
+    if speed != 'max':
+        return float(speed)
@@ -4,9 +4,13 @@
 
 import math
 from pyglet.gl import *
-from pyglet.text import Label, HTMLLabel
-from core.constants import Group as G, COLORS as C, FONT_SIZES as F
+from core.constants import Group as G, COLORS as C, FONT_SIZES as F, HEADLESS_MODE
+if HEADLESS_MODE:
+    from core.headless import HeadlessLabel as Label, HeadlessLabel as HTMLLabel
+else:
+    from pyglet.text import Label, HTMLLabel
 from pyglet import sprite
+from core import geometry
 from core.logger import logger
 from core.constants import BFLIM
 from core.utils import get_conf_value
@@ -22,7 +26,8 @@ class AbstractWidget:
         self.visible = False
         self.logger = logger
         self.highlight_aoi = get_conf_value('Openmatb', 'highlight_aoi')
-        glLineWidth(2)
+        if not HEADLESS_MODE:
+            glLineWidth(2)
 
         self.m_draw = 0
         self.verbose = False
@@ -86,6 +91,7 @@ class AbstractWidget:
                 v_tuple.batch = Window.MainWindow.batch
             else:
                 self.on_batch[name] = Window.MainWindow.batch.add(*v_tuple)
+        self.invalidate()
 
 
     def empty_batch(self):
@@ -98,6 +104,12 @@ class AbstractWidget:
 
         #self.vertex = dict()
         self.on_batch = dict()
+        self.invalidate()
+
+
+    def invalidate(self):
+        '''Ask for a redraw of the window, as the widget appearance has changed'''
+        Window.MainWindow.invalid = True
 
 
     def add_vertex(self, name, *args):
@@ -157,12 +169,7 @@ class AbstractWidget:
 
 
     def vertice_circle(self, center, radius, points_n=30):
-        v = list()
-        for i in range(points_n):
-            cosine= radius * math.cos(i*2*math.pi/points_n) + center[0]
-            sine  = radius * math.sin(i*2*math.pi/points_n) + center[1]
-            v.extend([cosine, sine])
-        return list(v)
+        return geometry.to_list(geometry.place('circle', points_n, center, radius))
 
 
     def vertice_border(self, container):
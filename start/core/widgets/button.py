@@ -3,7 +3,7 @@
 # License : CeCILL, version 2.1 (see the LICENSE file)
 
 from core.widgets import AbstractWidget
-from core.constants import COLORS as C, FONT_SIZES as F, PATHS as P
+from core.constants import COLORS as C, FONT_SIZES as F, PATHS as P, HEADLESS_MODE
 from core.constants import Group as G
 from pyglet.text import Label
 from pyglet import image, sprite
@@ -57,6 +57,10 @@ class PlayPause(Button):
     def __init__(self, name, container, callback):
         super().__init__(name, container, callback)
         self.current_image = None
+        self.sprites = dict()
+        if HEADLESS_MODE:  # No texture can be created without a window
+            self.show()
+            return
 
         img_path = P['IMG']
         self.pause_img = image.load(img_path.joinpath('pause.png'))
@@ -80,5 +84,7 @@ class PlayPause(Button):
 
 
     def update_button_sprite(self, is_paused):
+        if len(self.sprites) == 0:
+            return
         self.sprites[int(is_paused)].batch = None
         self.sprites[int(not is_paused)].batch = Window.MainWindow.batch
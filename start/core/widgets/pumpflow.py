@@ -32,6 +32,7 @@ class PumpFlow(AbstractWidget):
         if self.pump_string(flow) == self.get_flow():
             return
         self.vertex[self.label].text = self.pump_string(flow)
+        self.invalidate()
         self.logger.record_state(self.name, self.label, flow)
 
 
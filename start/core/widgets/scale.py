@@ -6,8 +6,7 @@ from pyglet.gl import *
 from core.container import Container
 from core.constants import COLORS as C, FONT_SIZES as F
 from core.constants import Group as G
-from core.widgets.abstractwidget import AbstractWidget
-from pyglet.text import Label
+from core.widgets.abstractwidget import AbstractWidget, Label
 
 
 class Scale(AbstractWidget):
@@ -71,6 +70,7 @@ class Scale(AbstractWidget):
              self.container.x2, self.container.y2, self.container.x1, self.container.y2)
              if visible else (0, 0)*4)
         self.on_batch['feedback'].vertices = v
+        self.invalidate()
         self.logger.record_state(self.name, 'feedback_visible', visible)
 
 
@@ -82,6 +82,7 @@ class Scale(AbstractWidget):
         if color == self.get_feedback_color():
             return
         self.on_batch['feedback'].colors[:] = color * 4
+        self.invalidate()
         self.logger.record_state(self.name, 'feedback_color', color)
 
 
@@ -94,6 +95,7 @@ class Scale(AbstractWidget):
             return
         self.position = position
         self.on_batch['arrow'].vertices = self.return_arrow_vertice(self.position)
+        self.invalidate()
         self.logger.record_state(self.name, 'arrow', self.position)
 
 
@@ -106,6 +108,7 @@ class Scale(AbstractWidget):
         if label == self.get_label():
             return
         self.vertex['label'].text = label_to_upper
+        self.invalidate()
         self.logger.record_state(self.name, 'label', label_to_upper)
 
 
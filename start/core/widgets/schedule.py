@@ -47,6 +47,7 @@ class Schedule(AbstractWidget):
         if bound_color == self.get_vertex_color('top_bound'):
             return
         self.on_batch['top_bound'].colors[:] = bound_color * 4
+        self.invalidate()
         self.logger.record_state(self.name, 'top_bound_color', bound_color)
 
 
@@ -65,6 +66,7 @@ class Schedule(AbstractWidget):
             self.on_batch[time_mode].resize(len(v)//2)    # Resize the vertex
             self.on_batch[time_mode].vertices = v         # Inform new vertices
             self.on_batch[time_mode].colors[:] = list(color) * (len(v)//2)
+        self.invalidate()
 
 
     def update(self):
@@ -59,6 +59,7 @@ class SimpleHTML(AbstractWidget):
         if text == self.get_text():
             return
         self.vertex['text'].text = self.preparse(text)
+        self.invalidate()
         self.logger.record_state(self.name, 'text', text)
 
 
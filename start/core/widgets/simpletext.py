@@ -29,6 +29,7 @@ class Simpletext(AbstractWidget):
         if text == self.get_text():
             return
         self.vertex['text'].text = text
+        self.invalidate()
         self.logger.record_state(self.name, 'text', text)
 
 
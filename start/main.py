@@ -20,16 +20,25 @@ language = gettext.translation('openmatb', LOCALE_PATH, [language_iso])
 language.install()
 
 
+# In headless mode, pyglet must not create its hidden shadow window (it needs a display)
+if '--headless' in sys.argv:
+    import pyglet
+    pyglet.options['shadow_window'] = False
+
 # Only after language installation, import core modules (they must be translated)
 from core import Scheduler, ReplayScheduler
-from core.constants import REPLAY_MODE
+from core.constants import REPLAY_MODE, HEADLESS_MODE
 from core.window import Window
+from core.headless import HeadlessWindow
 
 
 class OpenMATB:
     def __init__(self):
-        # The MATB window must be borderless (for non-fullscreen mode)
-        Window(style=Window.WINDOW_STYLE_DIALOG, resizable = True)
+        if HEADLESS_MODE:
+            HeadlessWindow()
+        else:
+            # The MATB window must be borderless (for non-fullscreen mode)
+            Window(style=Window.WINDOW_STYLE_DIALOG, resizable = True)
 
         if REPLAY_MODE:
             ReplayScheduler()
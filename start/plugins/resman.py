@@ -7,6 +7,7 @@ from core.container import Container
 from core.widgets import Pump, Tank, PumpFlow, Simpletext, Frame
 from plugins.abstractplugin import AbstractPlugin
 from core import validation
+from core.flownetwork import FlowNetwork, numpy
 from core.window import Window
 
 class Resman(AbstractPlugin):
@@ -118,6 +119,10 @@ class Resman(AbstractPlugin):
         self.automode_position = (0.48, 0.55)
         self.wait_before_leak = 1  # How many updates to wait before the leak begins
 
+        # Arrays view of the tanks and pumps network (without numpy, the parameters are walked)
+        self.network = FlowNetwork(self.parameters['tank'], self.parameters['pump']) \
+            if numpy is not None else None
+
         # Add response timers to target tanks, and an is_in_tolerance information
         for tank_letter, this_tank in self.parameters['tank'].items():
             if this_tank['target'] is not None:
@@ -232,53 +237,99 @@ class Resman(AbstractPlugin):
         pumps = self.parameters['pump']
         time_resolution = (self.parameters['taskupdatetime'] / 1000) / 60.
 
-        # 0. Compute automatic actions if heuristicsolver activated, three heuristics
-        # Browse only woorking pumps (state != -1)
+        if self.network is not None:
+            self.network.read(tanks, pumps)
 
         if self.wait_before_leak > 0:
             self.wait_before_leak -= 1
+        elif self.network is not None:
+            if self.parameters['automaticsolver'] is True:   # 0. Automatic solver heuristics
+                self.network.solve()
+            self.network.deplete(time_resolution)             # 1. Deplete target tanks
+            self.network.transfer(time_resolution)            # 2. Transfer pumps flows
         else:
-            if self.parameters['automaticsolver'] is True:
-                for pump_n, this_pump in {p: v for p, v in pumps.items() if v['state'] != 'failure'}.items():
-                    from_tank, to_tank = tanks[this_pump['_fromtank']], tanks[this_pump['_totank']]
+            self.compute_flows(time_resolution)
+
+        # The following is always executed (independent on wait_before_leak)
+        if self.network is not None:                          # 3. Deactivate pumps of full/empty tanks
+            self.network.deactivate_full_and_empty()
+            self.network.write(tanks, pumps)
+        else:
+            self.deactivate_full_and_empty_pumps()
+
+        for tank_l, this_tank in tanks.items():
+            if this_tank['target'] is not None:      # Record performance for target tanks
+                t, r = this_tank['target'], self.parameters['toleranceradius']
+                this_tank['_is_in_tolerance'] = float('nan')
+                if r > 0:  # If a tolerance level is defined
+                    this_tank['_is_in_tolerance'] = t - r <= this_tank['level'] <= t + r
+                    tolerance_color = self.parameters['tolerancecolor']
+                    if not this_tank['_is_in_tolerance']:  # If a response is needed
+                        tolerance_color = self.parameters['tolerancecoloroutside']
+                        this_tank['_response_time'] += self.parameters['taskupdatetime']
+                    elif this_tank['_response_time'] > 0:  # Back in the tolerance zone
+                        self.log_performance(f'{tank_l}_response_time', this_tank['_response_time'])
+                        this_tank['_response_time'] = 0
+                    this_tank['_tolerance_color'] = tolerance_color
+
+                deviation = this_tank['level'] - this_tank['target']
+                self.log_performance(f'{tank_l}_in_tolerance', this_tank['_is_in_tolerance'])
+                self.log_performance(f'{tank_l}_deviation', deviation)
+
+
+    def compute_flows(self, time_resolution):
+        '''Steps 0 to 2, walking the parameters (without numpy)'''
+        tanks = self.parameters['tank']
+        pumps = self.parameters['pump']
 
-                    # 0.1. Systematically activate pumps draining non-depletable tanks
-                    if not from_tank['depletable'] and this_pump['state'] == 'off':
+        # 0. Compute automatic actions if heuristicsolver activated, three heuristics
+        # Browse only woorking pumps (state != -1)
+        if self.parameters['automaticsolver'] is True:
+            for pump_n, this_pump in {p: v for p, v in pumps.items() if v['state'] != 'failure'}.items():
+                from_tank, to_tank = tanks[this_pump['_fromtank']], tanks[this_pump['_totank']]
+
+                # 0.1. Systematically activate pumps draining non-depletable tanks
+                if not from_tank['depletable'] and this_pump['state'] == 'off':
+                    this_pump['state'] = 'on'
+
+                # 0.2. Activate/deactivate pump whose target tank is too low/high
+                # "Too" means level is out of a tolerance zone around the target level (2500 +/- 150)
+                if to_tank['target'] is not None:
+                    if to_tank['level'] <= to_tank['target'] - 50:
                         this_pump['state'] = 'on'
+                    elif to_tank['level'] >= to_tank['target'] + 50:
+                        this_pump['state'] = 'off'
 
-                    # 0.2. Activate/deactivate pump whose target tank is too low/high
-                    # "Too" means level is out of a tolerance zone around the target level (2500 +/- 150)
-                    if to_tank['target'] is not None:
-                        if to_tank['level'] <= to_tank['target'] - 50:
-                            this_pump['state'] = 'on'
-                        elif to_tank['level'] >= to_tank['target'] + 50:
-                            this_pump['state'] = 'off'
+                # 0.3. Equilibrate between the two A/B tanks if sufficient level
+                if from_tank['target'] is not None and to_tank['target'] is not None:
+                    if from_tank['level'] >= to_tank['target'] >= to_tank['level']:
+                        this_pump['state'] = 'on'
+                    else:
+                        this_pump['state'] = 'off'
 
-                    # 0.3. Equilibrate between the two A/B tanks if sufficient level
-                    if from_tank['target'] is not None and to_tank['target'] is not None:
-                        if from_tank['level'] >= to_tank['target'] >= to_tank['level']:
-                            this_pump['state'] = 'on'
-                        else:
-                            this_pump['state'] = 'off'
+        for _, this_tank in tanks.items():           # 1. Deplete target tanks
+            if this_tank['target'] is not None:
+                this_tank['level'] -= min(int(this_tank['lossperminute'] *  time_resolution), this_tank['level'])
 
-            for _, this_tank in tanks.items():           # 1. Deplete target tanks
-                if this_tank['target'] is not None:
-                    this_tank['level'] -= min(int(this_tank['lossperminute'] *  time_resolution), this_tank['level'])
+        for pump_n, this_pump in pumps.items():      # 2. For each pump
+            if this_pump['state'] == 'on':           # 2.a Transfer flow if pump is ON
+                fromtank, totank = tanks[this_pump['_fromtank']], tanks[this_pump['_totank']]
 
-            for pump_n, this_pump in pumps.items():      # 2. For each pump
-                if this_pump['state'] == 'on':           # 2.a Transfer flow if pump is ON
-                    fromtank, totank = tanks[this_pump['_fromtank']], tanks[this_pump['_totank']]
+                                                # Compute (available) volume
+                volume = min(int(this_pump['flow']) * time_resolution, fromtank['level'])
 
-                                                    # Compute (available) volume
-                    volume = min(int(this_pump['flow']) * time_resolution, fromtank['level'])
+                if fromtank['depletable']:      # Drain it from tank (if its capacity is limited)...
+                    fromtank['level'] -= int(volume)
 
-                    if fromtank['depletable']:      # Drain it from tank (if its capacity is limited)...
-                        fromtank['level'] -= int(volume)
+                                                # ...to tank (if it's not full)
+                totank['level'] += min(int(volume), totank['max'] - totank['level'])
 
-                                                    # ...to tank (if it's not full)
-                    totank['level'] += min(int(volume), totank['max'] - totank['level'])
 
-        # The following is always executed (independent on wait_before_leak)
+    def deactivate_full_and_empty_pumps(self):
+        '''Step 3, walking the parameters (without numpy)'''
+        tanks = self.parameters['tank']
+        pumps = self.parameters['pump']
+
         for tank_l, this_tank in tanks.items():      # 3. For each tank
             pumps_to_deactivate = []
 
@@ -294,25 +345,6 @@ class Resman(AbstractPlugin):
                     this_pump['state'] = 'off'
 
 
-            if this_tank['target'] is not None:      # Record performance for target tanks
-                t, r = this_tank['target'], self.parameters['toleranceradius']
-                this_tank['_is_in_tolerance'] = float('nan')
-                if r > 0:  # If a tolerance level is defined
-                    this_tank['_is_in_tolerance'] = t - r <= this_tank['level'] <= t + r
-                    tolerance_color = self.parameters['tolerancecolor']
-                    if not this_tank['_is_in_tolerance']:  # If a response is needed
-                        tolerance_color = self.parameters['tolerancecoloroutside']
-                        this_tank['_response_time'] += self.parameters['taskupdatetime']
-                    elif this_tank['_response_time'] > 0:  # Back in the tolerance zone
-                        self.log_performance(f'{tank_l}_response_time', this_tank['_response_time'])
-                        this_tank['_response_time'] = 0
-                    this_tank['_tolerance_color'] = tolerance_color
-
-                deviation = this_tank['level'] - this_tank['target']
-                self.log_performance(f'{tank_l}_in_tolerance', this_tank['_is_in_tolerance'])
-                self.log_performance(f'{tank_l}_deviation', deviation)
-
-
     def refresh_widgets(self):
         if not super().refresh_widgets():
             return
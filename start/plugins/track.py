@@ -11,6 +11,29 @@ from core.constants import Group as G, COLORS as C, FONT_SIZES as F, REPLAY_MODE
 from core import validation
 from core.window import Window
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Adapted from Comstock et al., (1992) : the first MATB documentation
+# The cursor drifts along two sines of asynchroneous speeds (phase increments per tick). Each
+# phase goes back to 0 on the tick that follows the one where it exceeded 2*pi.
+X_SPEED, Y_SPEED = 0.005, 0.006
+X_PERIOD, Y_PERIOD = (ceil(2*pi/speed) + 1 for speed in (X_SPEED, Y_SPEED))
+
+
+def get_cursor_disturbance(tick, xgain, ygain):
+    '''Return the (x, y) cursor drift at a given tick (the first cursor tick is 1), in closed
+       form. tick can be a numpy array (e.g., all the ticks of a scenario): arrays are returned.'''
+    xsin = (tick % X_PERIOD) * X_SPEED
+    ysin = (tick % Y_PERIOD) * Y_SPEED
+    if numpy is not None and isinstance(tick, numpy.ndarray):
+        return numpy.sin(xsin) * xgain, numpy.sin(ysin) * ygain
+    return sin(xsin) * xgain, sin(ysin) * ygain
+
+
 class Track(AbstractPlugin):
     def __init__(self, label='', taskplacement='topmid', taskupdatetime=20, silent=False):
         super().__init__(_('Tracking'), taskplacement, taskupdatetime)
@@ -28,7 +51,8 @@ class Track(AbstractPlugin):
         self.parameters.update(new_par)
 
         self.automode_position = (0.35, 0.1)
-        self.cursor_path_gen = iter(self.compute_next_cursor_position())
+        self.cursor_tick = 0  # Number of cursor moves (the drift is a function of it)
+        self.moffx, self.moffy = 0, 0  # Accumulated joystick offset
         self.cursor_position = None
         self.cursor_color_key = 'cursorcolor'
         self.gain_ratio = 0.8  # The proportion of the reticle area the cursor should cover
@@ -57,7 +81,7 @@ class Track(AbstractPlugin):
         self.reticle_container = self.reticle.container
         self.xgain = (self.reticle_container.w * self.gain_ratio)/2
         self.ygain = (self.reticle_container.h * self.gain_ratio)/2
-        self.cursor_position = next(self.cursor_path_gen)
+        self.cursor_position = self.compute_next_cursor_position()
 
 
     def get_joystick_inputs(self, x, y):
@@ -73,7 +97,7 @@ class Track(AbstractPlugin):
         # In case of replay, do not compute cursor position.
         # : the ReplayScheduler will master it.
         if not REPLAY_MODE:
-            self.cursor_position = next(self.cursor_path_gen)
+            self.cursor_position = self.compute_next_cursor_position()
 
         self.cursor_color_key = 'cursorcolor' if self.reticle.is_cursor_in_target() \
                     else 'cursorcoloroutside'
@@ -97,61 +121,50 @@ class Track(AbstractPlugin):
 
 
     def compute_next_cursor_position(self):
-        # Adapted from Comstock et al., (1992) : the first MATB documentation
-        xsin, ysin = 0, 0
-        xincr, yincr = 0.005, 0.006  # Cursor (x, y) asynchroneous speeds
-
-        cursorx, cursory = 0, 0
-        moffx, moffy = 0, 0
-
-        while True:
-            # Must wait the drawing of the reticle to evaluate x & y gain
-            if f'{self.alias}_reticle' in self.widgets.keys():
-                xsin = xsin + xincr if xsin < 2*pi else 0
-                ysin = ysin + yincr if ysin < 2*pi else 0
-
-                cursorx = sin(xsin) * self.xgain
-                cursory = sin(ysin) * self.ygain
-
-                compx, compy = 0, 0
-                # Potential compensations of cursor movement
-                # If the automode is enabled, apply automatic compensation to the cursor drift
-                if self.parameters['automaticsolver'] == True:
-                    compx = 1 if -self.reticle.cursor_relative[0] >= 0 else -1
-                    compy = 1 if -self.reticle.cursor_relative[1] >= 0 else -1
-
-                # Else if a manual input (joystick) is recorded, apply its offset to the cursor,
-                # as a function of its gain
-                if self.parameters['inverseaxis'] == False:
-                    compx, compy = self.x_input, -self.y_input
-                else:
-                    compx, compy = -self.x_input, self.y_input
-
-                compx = compx * self.parameters['joystickforce']
-                compy = compy * self.parameters['joystickforce']
-
-                moffx = moffx + compx
-                moffy = moffy + compy
-
-                cursorx = cursorx + moffx
-                cursory = cursory + moffy
-
-                limitx = min(max(cursorx, -self.reticle.container.w/2), self.reticle.container.w/2)
-                limity = min(max(cursory, -self.reticle.container.h/2), self.reticle.container.h/2)
-
-                # If outside reticle limits, compensate cursor position
-                # Neutralize the joystick only if it does not go toward the center
-                if limitx != cursorx:
-                    diff = cursorx-limitx
-                    cursorx -= diff
-                    if compx !=0 and diff/compx > 0:  # Same sign
-                        moffx -= (diff + compx * self.parameters['joystickforce'])
-
-                if limity != cursory:
-                    diff = cursory-limity
-                    cursory -= diff
-                    if compy !=0 and diff/compy > 0:  # Same sign
-                        moffy -= (diff + compy * self.parameters['joystickforce'])
-                yield (cursorx, cursory)
-            else:
-                yield (0, 0)
+        # Must wait the drawing of the reticle to evaluate x & y gain
+        if f'{self.alias}_reticle' not in self.widgets.keys():
+            return (0, 0)
+
+        self.cursor_tick += 1
+        cursorx, cursory = get_cursor_disturbance(self.cursor_tick, self.xgain, self.ygain)
+
+        compx, compy = 0, 0
+        # Potential compensations of cursor movement
+        # If the automode is enabled, apply automatic compensation to the cursor drift
+        if self.parameters['automaticsolver'] == True:
+            compx = 1 if -self.reticle.cursor_relative[0] >= 0 else -1
+            compy = 1 if -self.reticle.cursor_relative[1] >= 0 else -1
+
+        # Else if a manual input (joystick) is recorded, apply its offset to the cursor,
+        # as a function of its gain
+        if self.parameters['inverseaxis'] == False:
+            compx, compy = self.x_input, -self.y_input
+        else:
+            compx, compy = -self.x_input, self.y_input
+
+        compx = compx * self.parameters['joystickforce']
+        compy = compy * self.parameters['joystickforce']
+
+        self.moffx = self.moffx + compx
+        self.moffy = self.moffy + compy
+
+        cursorx = cursorx + self.moffx
+        cursory = cursory + self.moffy
+
+        limitx = min(max(cursorx, -self.reticle.container.w/2), self.reticle.container.w/2)
+        limity = min(max(cursory, -self.reticle.container.h/2), self.reticle.container.h/2)
+
+        # If outside reticle limits, compensate cursor position
+        # Neutralize the joystick only if it does not go toward the center
+        if limitx != cursorx:
+            diff = cursorx-limitx
+            cursorx -= diff
+            if compx !=0 and diff/compx > 0:  # Same sign
+                self.moffx -= (diff + compx * self.parameters['joystickforce'])
+
+        if limity != cursory:
+            diff = cursory-limity
+            cursory -= diff
+            if compy !=0 and diff/compy > 0:  # Same sign
+                self.moffy -= (diff + compy * self.parameters['joystickforce'])
+        return (cursorx, cursory)